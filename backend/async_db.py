@@ -0,0 +1,47 @@
+"""
+Async facade over db.py for code running on the event loop.
+
+Every call runs the synchronous db function on a dedicated thread pool sized
+to the SQLite connection pool, so a slow read or a write lock never stalls
+audio forwarding in the WebSocket proxy.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from . import db
+from .config import DB_POOL_SIZE
+
+_executor: ThreadPoolExecutor | None = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="db")
+    return _executor
+
+async def run(fn, *args, **kwargs):
+    """Run a blocking db callable on the db executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+async def verify_customer(email: str, full_name: str = "", last4: str = "", order_id: str = ""):
+    return await run(db.verify_customer, email, full_name, last4, order_id)
+
+async def get_customer_policies(email: str):
+    return await run(db.get_customer_policies, email)
+
+async def get_policy(topic: str):
+    return await run(db.get_policy, topic)
+
+async def resolve_topic(query: str, limit: int = 3):
+    return await run(db.resolve_topic, query, limit)
+
+async def log(actor: str, event: str, detail: str = ""):
+    return await run(db.log, actor, event, detail)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
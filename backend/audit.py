@@ -0,0 +1,207 @@
+"""
+Batched, asynchronous audit log writer.
+
+db.log() enqueues events in memory; a background thread drains the queue and
+writes them in a single transaction once AUDIT_BATCH_SIZE events are pending
+or AUDIT_FLUSH_INTERVAL seconds have passed, so request handlers never pay for
+an INSERT + commit per event.
+"""
+import atexit
+import json
+import queue
+import threading
+from datetime import datetime
+
+from . import logs, session_store
+from .pool import get_pool
+from .config import (
+    AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL,
+    AUDIT_OVERFLOW_POLICY, AUDIT_BLOCK_TIMEOUT, AUDIT_QUEUE_BACKEND,
+)
+
+logger = logs.get_logger("audit")
+
+class AuditWriter:
+    def __init__(self, queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 0.5, overflow_policy: str = "block",
+                 block_timeout: float = 0.05):
+        if overflow_policy not in ("block", "drop"):
+            raise ValueError("overflow_policy must be 'block' or 'drop'")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats = {"queued": 0, "flushed": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def submit(self, actor: str, event: str, detail: str = "") -> bool:
+        """Enqueue an audit event. Returns False if it was dropped."""
+        if self._stopped.is_set():
+            # Writer already shut down: write through rather than lose the event
+            self._write([(datetime.utcnow().isoformat(), actor, event, detail)])
+            return True
+        self._ensure_started()
+        row = (datetime.utcnow().isoformat(), actor, event, detail)
+        try:
+            if self.overflow_policy == "block":
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _drain(self) -> list:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write(self, rows: list):
+        with get_pool().connection() as conn:
+            conn.executemany("INSERT INTO audits(ts, actor, event, detail) VALUES(?,?,?,?)", rows)
+            conn.commit()
+
+    def flush(self) -> int:
+        """Write everything currently queued. Safe to call from any thread."""
+        with self._flush_lock:
+            rows = self._drain()
+            if not rows:
+                return 0
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    self._write(rows[i:i + self.batch_size])
+            except Exception as e:
+                self._count("errors")
+                self._count("dropped", len(rows))
+                logger.error("⚠️ Audit flush failed, %d events lost: %s", len(rows), e)
+                return 0
+            with self._lock:
+                self._stats["flushed"] += len(rows)
+                self._stats["batches"] += 1
+            return len(rows)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def shutdown(self):
+        """Stop the background thread and flush anything still queued."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["pending"] = self._queue.qsize()
+        s["capacity"] = self._queue.maxsize
+        s["overflow_policy"] = self.overflow_policy
+        return s
+
+class StoreAuditWriter(AuditWriter):
+    """AuditWriter whose queue is a list in the session store, shared by every worker"""
+
+    KEY = "audit:queue"
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 200, flush_interval: float = 0.5):
+        super().__init__(queue_size, batch_size, flush_interval, "drop")
+        self.queue_size = queue_size
+        self._stats["direct"] = 0  # events written through because the store was unreachable
+
+    def submit(self, actor: str, event: str, detail: str = "") -> bool:
+        row = (datetime.utcnow().isoformat(), actor, event, detail)
+        if self._stopped.is_set():
+            self._write([row])
+            return True
+        self._ensure_started()
+        try:
+            # When the shared queue is full the oldest events are trimmed
+            length = session_store.get_store().push(self.KEY, [json.dumps(row)], self.queue_size)
+        except Exception as e:
+            # Store unreachable: write through rather than lose the event
+            logger.warning("⚠️ Shared audit queue unavailable, writing directly: %s", e)
+            self._write([row])
+            self._count("direct")
+            return True
+        self._count("queued")
+        if length > self.queue_size:
+            self._count("dropped", length - self.queue_size)
+        if length >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _drain(self) -> list:
+        rows = []
+        store = session_store.get_store()
+        try:
+            while True:
+                batch = store.pop(self.KEY, self.batch_size)
+                rows.extend(tuple(json.loads(r)) for r in batch)
+                if len(batch) < self.batch_size:
+                    return rows
+        except Exception as e:
+            self._count("errors")
+            logger.error("⚠️ Could not read shared audit queue: %s", e)
+            return rows
+
+    def stats(self) -> dict:
+        s = super().stats()
+        try:
+            s["pending"] = session_store.get_store().length(self.KEY)
+        except Exception:
+            s["pending"] = None
+        s["capacity"] = self.queue_size
+        s["overflow_policy"] = "drop_oldest"
+        s["backend"] = "store"
+        return s
+
+_writer: AuditWriter | None = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                if AUDIT_QUEUE_BACKEND == "store":
+                    _writer = StoreAuditWriter(AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL)
+                else:
+                    _writer = AuditWriter(AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL,
+                                          AUDIT_OVERFLOW_POLICY, AUDIT_BLOCK_TIMEOUT)
+                atexit.register(_writer.shutdown)
+    return _writer
+
+def shutdown():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.shutdown()
+            atexit.unregister(_writer.shutdown)
+            _writer = None
@@ -1,15 +1,25 @@
+import secrets
+
 import httpx
 from fastapi import HTTPException
-from .config import OPENAI_API_KEY, REALTIME_MODEL, REALTIME_VOICE, REALTIME_SESSIONS_URL
 
-# Simple in-memory session flags (swap for Redis in prod)
-SESSION_FLAGS: dict[str, dict] = {}
+from . import http_client, logs, profiles, session_store
+from .config import OPENAI_API_KEY, REALTIME_SESSIONS_URL
+
+logger = logs.get_logger("auth")
+
+def new_session_id() -> str:
+    """Unguessable ID for one caller's session state (one per /ws/realtime connection)"""
+    return secrets.token_urlsafe(16)
 
 def set_verified(session_id: str, value: bool):
-    SESSION_FLAGS.setdefault(session_id, {})["verified"] = value
+    session_store.get_store().update(session_id, {"verified": value})
 
 def is_verified(session_id: str) -> bool:
-    return bool(SESSION_FLAGS.get(session_id, {}).get("verified"))
+    return bool(session_store.get_store().get(session_id).get("verified"))
+
+def end_session(session_id: str):
+    session_store.get_store().delete(session_id)
 
 async def create_ephemeral_session():
     """
@@ -25,65 +35,74 @@ async def create_ephemeral_session():
         "OpenAI-Beta": "realtime=v1"
     }
     
+    # Model, voice and tool schemas come from the (cached) default session profile
+    body = profiles.registry.get().ephemeral_body
+    
+    r = await http_client.post(REALTIME_SESSIONS_URL, headers=headers, json=body)
+    try:
+        r.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    
+    result = r.json()
+    
+    # Extract the client_secret value from the nested structure
+    client_secret = result.get('client_secret', {}).get('value')
+    if not client_secret:
+        raise HTTPException(500, "No client_secret in response")
+    
+    # Return the session with the extracted client_secret
+    return {
+        "id": result.get('id'),
+        "client_secret": client_secret,
+        "model": result.get('model'),
+        "voice": result.get('voice'),
+        "expires_at": result.get('expires_at')
+    }
+
+async def create_webrtc_token():
+    """
+    Create an ephemeral token for a browser-side WebRTC connection.
+    Unlike create_ephemeral_session, tools and instructions are configured by the browser.
+    """
+    if not OPENAI_API_KEY:
+        raise HTTPException(500, "OPENAI_API_KEY not configured")
+    
+    headers = {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    # Create ephemeral token for WebRTC - using the sessions endpoint
     body = {
-        "model": REALTIME_MODEL,    # "gpt-realtime"
-        "voice": REALTIME_VOICE,    # e.g., "marin"
-        "modalities": ["audio", "text"],
-        "input_audio_format": "pcm16",
-        "tools": [
-            {
-                "type": "function",
-                "name": "verify_customer",
-                "description": "Verify a customer before sharing non-public information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "email": {"type": "string", "description": "Customer email address"},
-                        "full_name": {"type": "string", "description": "Customer full name"},
-                        "last4": {"type": "string", "description": "Last 4 digits of payment method"},
-                        "order_id": {"type": "string", "description": "Order ID for verification"}
-                    },
-                    "required": ["email"]
-                }
-            },
-            {
-                "type": "function",
-                "name": "get_policy",
-                "description": "Fetch a policy by topic. Only use after verification for internal/restricted policies",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "topic": {"type": "string", "description": "Policy topic to search for"},
-                        "detail_level": {
-                            "type": "string", 
-                            "enum": ["summary", "full"],
-                            "description": "Level of detail to return"
-                        }
-                    },
-                    "required": ["topic"]
-                }
-            }
-        ]
+        "model": "gpt-4o-realtime-preview-2024-10-01",
+        "voice": "shimmer",
+        "modalities": ["audio", "text"]
     }
     
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        r = await client.post(REALTIME_SESSIONS_URL, headers=headers, json=body)
-        try:
-            r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        
+    try:
+        r = await http_client.post(REALTIME_SESSIONS_URL, headers=headers, json=body)
+        r.raise_for_status()
         result = r.json()
         
-        # Extract the client_secret value from the nested structure
-        client_secret = result.get('client_secret', {}).get('value')
-        if not client_secret:
-            raise HTTPException(500, "No client_secret in response")
+        logger.info("✅ Ephemeral token created: session %s", result.get("id"))
+        
+        # Extract client_secret from the response
+        client_secret = result.get('client_secret', {})
+        if isinstance(client_secret, dict):
+            client_secret_value = client_secret.get('value')
+        else:
+            client_secret_value = client_secret
+        
+        if not client_secret_value:
+            raise HTTPException(500, f"No client_secret in response: {result}")
         
-        # Return the session with the extracted client_secret
         return {
-            "id": result.get('id'),
-            "client_secret": client_secret,
-            "model": result.get('model'),
-            "voice": result.get('voice')
-        }
\ No newline at end of file
+            "client_secret": client_secret_value,
+            "expires_at": result.get("expires_at"),
+            "session_id": result.get("id")
+        }
+    except httpx.HTTPStatusError as e:
+        error_text = e.response.text
+        logger.error("❌ Token creation failed: %s", error_text)
+        raise HTTPException(status_code=e.response.status_code, detail=f"OpenAI API error: {error_text}")
\ No newline at end of file
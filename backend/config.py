@@ -14,4 +14,92 @@ ADMIN_SECRET = os.getenv("ADMIN_SECRET", "change-me")
 # Realtime config - Aligned with latest OpenAI documentation (Aug 28, 2025)
 REALTIME_MODEL = os.getenv("REALTIME_MODEL", "gpt-realtime")
 REALTIME_VOICE = os.getenv("REALTIME_VOICE", "shimmer")  # More natural, professional voice
-REALTIME_SESSIONS_URL = "https://api.openai.com/v1/realtime/sessions"
+# Point both at `python -m backend.mock_realtime` to run without the real API
+REALTIME_SESSIONS_URL = os.getenv("REALTIME_SESSIONS_URL", "https://api.openai.com/v1/realtime/sessions")
+REALTIME_WS_URL = os.getenv("REALTIME_WS_URL", "wss://api.openai.com/v1/realtime")
+
+# SQLite connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5.0"))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # OFF|NORMAL|FULL (NORMAL is safe with WAL)
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-16000"))  # negative = KiB, i.e. ~16MB per connection
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+# Audit log writer
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5"))  # seconds
+AUDIT_OVERFLOW_POLICY = os.getenv("AUDIT_OVERFLOW_POLICY", "block")  # block|drop when queue is full
+AUDIT_BLOCK_TIMEOUT = float(os.getenv("AUDIT_BLOCK_TIMEOUT", "0.05"))  # max wait before dropping under "block"
+
+# Policy document cache (invalidated whenever policies are seeded)
+POLICY_CACHE_SIZE = int(os.getenv("POLICY_CACHE_SIZE", "256"))
+POLICY_CACHE_TTL = float(os.getenv("POLICY_CACHE_TTL", "300"))  # seconds
+# How often each worker checks the shared policies version for writes made by other workers
+POLICY_CACHE_SYNC_INTERVAL = float(os.getenv("POLICY_CACHE_SYNC_INTERVAL", "1.0"))  # seconds
+
+# Minimum confidence for get_pc_coverage_info to accept a resolved topic
+TOPIC_MATCH_THRESHOLD = float(os.getenv("TOPIC_MATCH_THRESHOLD", "0.35"))
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # DEBUG|INFO|WARNING|ERROR
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_AUDIO_SAMPLE_EVERY = max(1, int(os.getenv("LOG_AUDIO_SAMPLE_EVERY", "200")))  # log 1 in N audio events
+
+# Shared HTTP client (OpenAI REST calls)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20.0"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))  # seconds
+
+# Pre-minted ephemeral sessions (per endpoint); 0 disables the pool
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "2"))
+SESSION_POOL_MIN_TTL = float(os.getenv("SESSION_POOL_MIN_TTL", "15"))  # discard sessions this close to expiry
+SESSION_DEFAULT_TTL = float(os.getenv("SESSION_DEFAULT_TTL", "60"))  # when the API omits expires_at
+
+# Session profiles (instructions, voice, VAD, tools sent in session.update)
+SESSION_PROFILES_PATH = os.getenv("SESSION_PROFILES_PATH", os.path.join(os.path.dirname(__file__), "session_profiles", "profiles.json"))
+DEFAULT_PROFILE = os.getenv("DEFAULT_PROFILE", "default")
+PROFILE_RELOAD_INTERVAL = float(os.getenv("PROFILE_RELOAD_INTERVAL", "2.0"))  # seconds between file change checks
+
+# Per-session state (verification flags); "redis" shares it across worker processes
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # memory|redis
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "redis://127.0.0.1:6390/0")  # real Redis or `python -m backend.state_server`
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))  # seconds since last use
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))  # memory backend only
+
+# Verification attempts allowed per email per window (shared across workers with SESSION_STORE=redis)
+VERIFY_RATE_LIMIT = int(os.getenv("VERIFY_RATE_LIMIT", "10"))  # 0 disables
+VERIFY_RATE_WINDOW = float(os.getenv("VERIFY_RATE_WINDOW", "300"))  # seconds
+
+# Audit queue: "local" per process, or "store" to queue in the session store so any worker can flush it
+AUDIT_QUEUE_BACKEND = os.getenv("AUDIT_QUEUE_BACKEND", "local")  # local|store
+
+# Tool call_ids remembered per connection to drop duplicate announcements
+TOOL_SEEN_CALLS = int(os.getenv("TOOL_SEEN_CALLS", "256"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "5.0"))  # seconds per tool call unless the tool sets its own
+# Characters of compact JSON a tool output may send to the model (0 = no cap)
+TOOL_OUTPUT_MAX_CHARS = int(os.getenv("TOOL_OUTPUT_MAX_CHARS", "4000"))
+
+# Load a customer's policies right after a successful verify_customer
+PREFETCH_POLICIES = os.getenv("PREFETCH_POLICIES", "true").lower() == "true"
+PREFETCH_POLICY_SUMMARY = os.getenv("PREFETCH_POLICY_SUMMARY", "true").lower() == "true"  # add a summary to the verification output
+PREFETCH_SUMMARY_WAIT = float(os.getenv("PREFETCH_SUMMARY_WAIT", "1.0"))  # seconds verify_customer waits for the summary
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "60"))  # seconds a prefetch may serve get_customer_policies
+
+# WebSocket relay: bounded per-direction send queues (messages per connection)
+RELAY_QUEUE_SIZE = int(os.getenv("RELAY_QUEUE_SIZE", "256"))
+# What happens to audio when a queue is full: coalesce|drop_oldest|block (other events are never dropped)
+RELAY_OVERFLOW_POLICY = os.getenv("RELAY_OVERFLOW_POLICY", "coalesce")
+RELAY_COALESCE_MAX_MS = int(os.getenv("RELAY_COALESCE_MAX_MS", "1000"))  # largest merged audio frame
+RELAY_LAG_INTERVAL = float(os.getenv("RELAY_LAG_INTERVAL", "0.25"))  # seconds between event-loop lag samples
+
+# Upstream reconnect: a dropped Realtime connection is re-opened with a pre-minted session
+UPSTREAM_RECONNECT_ATTEMPTS = int(os.getenv("UPSTREAM_RECONNECT_ATTEMPTS", "3"))  # 0 disables
+UPSTREAM_RECONNECT_BACKOFF = float(os.getenv("UPSTREAM_RECONNECT_BACKOFF", "0.25"))  # seconds, doubled per attempt
+UPSTREAM_RECONNECT_MAX = int(os.getenv("UPSTREAM_RECONNECT_MAX", "5"))  # reconnects per caller connection
+UPSTREAM_STABLE_SECONDS = float(os.getenv("UPSTREAM_STABLE_SECONDS", "10"))  # uptime that resets the backoff
+UPSTREAM_BUFFER_MS = int(os.getenv("UPSTREAM_BUFFER_MS", "5000"))  # caller audio kept while reconnecting
+UPSTREAM_SUMMARY_TURNS = int(os.getenv("UPSTREAM_SUMMARY_TURNS", "20"))  # recent turns replayed as a summary
@@ -1,248 +1,278 @@
 import sqlite3
+import threading
+import time
 from datetime import datetime
-from .config import DB_PATH
+from . import audit, logs, migrations, pool, search, topics
+from .cache import LRUCache
+from .config import POLICY_CACHE_SIZE, POLICY_CACHE_TTL, POLICY_CACHE_SYNC_INTERVAL
+from .pool import get_pool
+
+logger = logs.get_logger("db")
+
+_policy_cache = LRUCache(POLICY_CACHE_SIZE, POLICY_CACHE_TTL)
+_resolver = None
+_resolver_version = -1
+# Shared policies version (data_versions table) last seen by this process, and when it was read
+_policies_version = None
+_policies_version_read = 0.0
+_policies_version_lock = threading.Lock()
 
 def _conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Check out a pooled connection; use as `with _conn() as conn:`"""
+    return get_pool().connection()
 
-def init_db():
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS policies(
-      topic TEXT PRIMARY KEY,
-      section TEXT NOT NULL,
-      classification TEXT NOT NULL, -- public|internal|restricted
-      text TEXT NOT NULL,
-      updated_at TEXT NOT NULL
-    )""")
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS customers(
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      full_name TEXT NOT NULL,
-      email TEXT NOT NULL UNIQUE,
-      last4 TEXT,
-      order_id TEXT
-    )""")
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS customer_policies(
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      customer_email TEXT NOT NULL,
-      policy_number TEXT NOT NULL UNIQUE,
-      first_name TEXT NOT NULL,
-      last_name TEXT NOT NULL,
-      premium REAL NOT NULL,
-      coverage_type TEXT NOT NULL,
-      next_due_date TEXT NOT NULL,
-      payment_method TEXT NOT NULL,
-      status TEXT NOT NULL DEFAULT 'active', -- active|inactive
-      created_at TEXT NOT NULL,
-      FOREIGN KEY (customer_email) REFERENCES customers(email)
-    )""")
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS audits(
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      ts TEXT NOT NULL,
-      actor TEXT NOT NULL,
-      event TEXT NOT NULL,
-      detail TEXT
-    )""")
-    conn.commit()
-    conn.close()
+def pool_stats():
+    return get_pool().stats()
 
-def seed_many(policies, customers):
-    conn = _conn()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    for p in policies:
+def close_pool():
+    """Close every pooled connection (shutdown, end of a benchmark)"""
+    pool.close_pool()
+
+def init_db(run_migrations: bool = True):
+    """Create tables, then apply pending schema migrations. Returns the migrations applied."""
+    with _conn() as conn:
+        c = conn.cursor()
         c.execute("""
-        INSERT INTO policies(topic, section, classification, text, updated_at)
-        VALUES(?,?,?,?,?)
-        ON CONFLICT(topic) DO UPDATE SET
-          section=excluded.section,
-          classification=excluded.classification,
-          text=excluded.text,
-          updated_at=excluded.updated_at
-        """, (p["topic"].strip().lower(), p["section"], p["classification"], p["text"], now))
-    for u in customers:
+        CREATE TABLE IF NOT EXISTS policies(
+          topic TEXT PRIMARY KEY,
+          section TEXT NOT NULL,
+          classification TEXT NOT NULL, -- public|internal|restricted
+          text TEXT NOT NULL,
+          updated_at TEXT NOT NULL
+        )""")
         c.execute("""
-        INSERT INTO customers(full_name, email, last4, order_id)
-        VALUES(?,?,?,?)
-        ON CONFLICT(email) DO UPDATE SET
-          full_name=excluded.full_name,
-          last4=excluded.last4,
-          order_id=excluded.order_id
-        """, (u["full_name"], u["email"].lower(), u.get("last4"), u.get("order_id")))
-    conn.commit()
-    conn.close()
+        CREATE TABLE IF NOT EXISTS customers(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          full_name TEXT NOT NULL,
+          email TEXT NOT NULL UNIQUE,
+          last4 TEXT,
+          order_id TEXT
+        )""")
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS customer_policies(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          customer_email TEXT NOT NULL,
+          policy_number TEXT NOT NULL UNIQUE,
+          first_name TEXT NOT NULL,
+          last_name TEXT NOT NULL,
+          premium REAL NOT NULL,
+          coverage_type TEXT NOT NULL,
+          next_due_date TEXT NOT NULL,
+          payment_method TEXT NOT NULL,
+          status TEXT NOT NULL DEFAULT 'active', -- active|inactive
+          created_at TEXT NOT NULL,
+          FOREIGN KEY (customer_email) REFERENCES customers(email)
+        )""")
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS audits(
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          ts TEXT NOT NULL,
+          actor TEXT NOT NULL,
+          event TEXT NOT NULL,
+          detail TEXT
+        )""")
+        search.ensure_index(conn)
+        conn.commit()
+        return migrations.run(conn) if run_migrations else []
+
+def seed_many(policies, customers):
+    with _conn() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        for p in policies:
+            c.execute("""
+            INSERT INTO policies(topic, section, classification, text, updated_at)
+            VALUES(?,?,?,?,?)
+            ON CONFLICT(topic) DO UPDATE SET
+              section=excluded.section,
+              classification=excluded.classification,
+              text=excluded.text,
+              updated_at=excluded.updated_at
+            """, (p["topic"].strip().lower(), p["section"], p["classification"], p["text"], now))
+        for u in customers:
+            c.execute("""
+            INSERT INTO customers(full_name, email, last4, order_id, email_norm, name_norm)
+            VALUES(?,?,?,?,?,?)
+            ON CONFLICT(email) DO UPDATE SET
+              full_name=excluded.full_name,
+              last4=excluded.last4,
+              order_id=excluded.order_id,
+              email_norm=excluded.email_norm,
+              name_norm=excluded.name_norm
+            """, (u["full_name"], u["email"].lower(), u.get("last4"), u.get("order_id"),
+                  migrations.normalize_email(u["email"]), migrations.normalize_name(u["full_name"])))
+        conn.commit()
+    if policies:
+        invalidate_policy_cache()
+
+def _read_policies_version():
+    try:
+        with _conn() as conn:
+            row = conn.execute("SELECT version FROM data_versions WHERE name = 'policies'").fetchone()
+    except sqlite3.OperationalError:
+        return None  # migrations not applied
+    return row[0] if row else None
+
+def _sync_policy_cache():
+    """Drop this process's cached policies once another worker has written the table.
+    Reads the shared version at most every POLICY_CACHE_SYNC_INTERVAL seconds."""
+    global _policies_version, _policies_version_read
+    with _policies_version_lock:
+        now = time.monotonic()
+        if now - _policies_version_read < POLICY_CACHE_SYNC_INTERVAL:
+            return
+        _policies_version_read = now
+        version = _read_policies_version()
+        changed = version != _policies_version
+        _policies_version = version
+    if changed:
+        _policy_cache.invalidate()
 
 def get_policy(topic: str):
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("SELECT * FROM policies WHERE topic = ?", (topic.strip().lower(),))
-    row = c.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    _sync_policy_cache()
+    key = topic.strip().lower()
+    cached = _policy_cache.get(key)
+    if cached is not None:
+        return dict(cached) if cached else None
+    version = _policy_cache.version
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM policies WHERE topic = ?", (key,))
+        row = c.fetchone()
+    policy = dict(row) if row else None
+    # Misses are cached too (as {}) so unknown topics don't hit disk either
+    _policy_cache.set(key, dict(policy) if policy else {}, version)
+    return policy
 
-def search_policies(query: str):
-    """Search policies by topic with fuzzy matching"""
-    conn = _conn()
-    c = conn.cursor()
-    search_term = f"%{query.strip().lower()}%"
-    c.execute("""
-        SELECT topic, section, classification, updated_at 
-        FROM policies 
-        WHERE topic LIKE ? OR section LIKE ? OR text LIKE ?
-        ORDER BY topic
-    """, (search_term, search_term, search_term))
-    rows = [dict(r) for r in c.fetchall()]
-    conn.close()
-    return rows
+def resolve_topic(query: str, limit: int = 3):
+    """Map a free-form topic/coverage phrase to [(topic, confidence), ...], best first"""
+    global _resolver, _resolver_version
+    _sync_policy_cache()
+    version = _policy_cache.version
+    if _resolver is None or _resolver_version != version:
+        _resolver = topics.TopicResolver(list_policies())
+        _resolver_version = version
+    return _resolver.candidates(query, limit)
+
+def invalidate_policy_cache():
+    """After a write from this process; other workers notice through _sync_policy_cache"""
+    global _policies_version, _policies_version_read
+    _policy_cache.invalidate()
+    with _policies_version_lock:
+        _policies_version = _read_policies_version()
+        _policies_version_read = time.monotonic()
+
+def policy_cache_stats():
+    return _policy_cache.stats()
+
+def search_policies(query: str, limit: int | None = None, exclude_classifications: tuple = (),
+                    snippets: bool = False):
+    """Ranked full-text search over topic, section and text (prefix matching); unbounded unless
+    `limit` is given. Rows have topic, section, classification and updated_at"""
+    if not query.strip():
+        return [p for p in list_policies() if p["classification"] not in exclude_classifications][:limit]
+    with _conn() as conn:
+        return search.search(conn, query, limit, tuple(exclude_classifications), snippets)
+
+def count_policies() -> int:
+    with _conn() as conn:
+        return conn.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
 
 def list_policies():
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("SELECT topic, section, classification, updated_at FROM policies ORDER BY topic")
-    rows = [dict(r) for r in c.fetchall()]
-    conn.close()
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT topic, section, classification, updated_at FROM policies ORDER BY topic")
+        rows = [dict(r) for r in c.fetchall()]
     return rows
 
 def verify_customer(email: str, full_name: str = "", last4: str = "", order_id: str = ""):
-    print(f"\n{'='*80}")
-    print(f"🔍 VERIFICATION ATTEMPT")
-    print(f"{'='*80}")
-    print(f"Provided values:")
-    print(f"  Email: '{email}'")
-    print(f"  Full Name: '{full_name}'")
-    print(f"  Last4: '{last4}'")
-    print(f"  Order ID: '{order_id}'")
-    
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("SELECT * FROM customers WHERE email = ?", (email.lower(),))
-    row = c.fetchone()
-    conn.close()
+    email_norm = migrations.normalize_email(email)
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM customers WHERE email_norm = ?", (email_norm,))
+        row = c.fetchone()
+        # Customers inserted without the normalized columns can't match until they are filled in
+        if not row and migrations.fill_customer_norms(conn):
+            c.execute("SELECT * FROM customers WHERE email_norm = ?", (email_norm,))
+            row = c.fetchone()
     
     if not row:
-        print(f"❌ Customer not found in database for email: {email}")
-        print(f"{'='*80}\n")
+        logger.info("verification failed: customer not found %s", logs.redact_email(email))
         return False
     
-    print(f"\nDatabase values:")
-    print(f"  Full Name: '{row['full_name']}'")
-    print(f"  Last4: '{row['last4']}'")
-    print(f"  Order ID: '{row['order_id']}'")
-    
-    # Flexible name matching - handle common variations
-    if full_name:
-        provided_name = full_name.strip().lower()
-        actual_name = row["full_name"].lower()
-        
-        print(f"\nName comparison:")
-        print(f"  Provided (normalized): '{provided_name}'")
-        print(f"  Database (normalized): '{actual_name}'")
-        
-        # Exact match
-        ok_name = provided_name == actual_name
-        print(f"  Exact match: {ok_name}")
-        
-        # If not exact, try common spelling variations
-        if not ok_name:
-            # Handle "Gray" vs "Grey" and other common variations
-            variations = {
-                'grey': 'gray',
-                'gray': 'grey',
-            }
-            normalized_provided = provided_name
-            for old, new in variations.items():
-                normalized_provided = normalized_provided.replace(old, new)
-            ok_name = normalized_provided == actual_name
-            print(f"  After variations: {ok_name} (normalized: '{normalized_provided}')")
-    else:
-        ok_name = True
-        print(f"\nName check: SKIPPED (no name provided)")
-    
+    # Names are compared in normalized form (case, whitespace, grey/gray) against the
+    # pre-normalized column; rows written without it are normalized here
+    stored_name = row["name_norm"] if row["name_norm"] is not None else migrations.normalize_name(row["full_name"] or "")
+    ok_name = (not full_name) or migrations.normalize_name(full_name) == stored_name
     ok_last4 = (not last4) or (last4 == (row["last4"] or ""))
     ok_order = (not order_id) or (order_id == (row["order_id"] or ""))
     
-    print(f"\nVerification results:")
-    print(f"  Name match: {ok_name}")
-    print(f"  Last4 match: {ok_last4}")
-    print(f"  Order ID match: {ok_order}")
-    
     final_result = bool(ok_name and ok_last4 and ok_order)
-    print(f"\n{'✅ VERIFIED' if final_result else '❌ VERIFICATION FAILED'}")
-    print(f"{'='*80}\n")
-    
+    logger.info("verification %s for %s (name=%s last4=%s order=%s)",
+                "succeeded" if final_result else "failed", logs.redact_email(email),
+                ok_name, ok_last4, ok_order)
     return final_result
 
 def log(actor: str, event: str, detail: str = ""):
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("INSERT INTO audits(ts, actor, event, detail) VALUES(?,?,?,?)",
-              (datetime.utcnow().isoformat(), actor, event, detail))
-    conn.commit()
-    conn.close()
+    """Queue an audit event; it is written in the next batch by audit.AuditWriter"""
+    audit.get_writer().submit(actor, event, detail)
+
+def audit_stats():
+    return audit.get_writer().stats()
 
 def list_audits(limit=200):
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("SELECT * FROM audits ORDER BY id DESC LIMIT ?", (limit,))
-    rows = [dict(r) for r in c.fetchall()]
-    conn.close()
+    audit.get_writer().flush()
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM audits ORDER BY id DESC LIMIT ?", (limit,))
+        rows = [dict(r) for r in c.fetchall()]
     return rows
 
 # ===== Customer Policy Management =====
 def get_customer_policies(email: str):
     """Get all policies for a customer"""
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("""
-        SELECT * FROM customer_policies 
-        WHERE customer_email = ? 
-        ORDER BY created_at DESC
-    """, (email.lower(),))
-    rows = [dict(r) for r in c.fetchall()]
-    conn.close()
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT * FROM customer_policies 
+            WHERE customer_email = ? 
+            ORDER BY created_at DESC
+        """, (email.lower(),))
+        rows = [dict(r) for r in c.fetchall()]
     return rows
 
 def get_policy_by_number(policy_number: str):
     """Get policy details by policy number"""
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("SELECT * FROM customer_policies WHERE policy_number = ?", (policy_number,))
-    row = c.fetchone()
-    conn.close()
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM customer_policies WHERE policy_number = ?", (policy_number,))
+        row = c.fetchone()
     return dict(row) if row else None
 
 def add_customer_policy(customer_email: str, policy_number: str, first_name: str, 
                        last_name: str, premium: float, coverage_type: str, 
                        next_due_date: str, payment_method: str, status: str = "active"):
     """Add a new customer policy"""
-    conn = _conn()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    c.execute("""
-        INSERT INTO customer_policies(
-            customer_email, policy_number, first_name, last_name, 
-            premium, coverage_type, next_due_date, payment_method, 
-            status, created_at
-        ) VALUES(?,?,?,?,?,?,?,?,?,?)
-    """, (customer_email.lower(), policy_number, first_name, last_name, 
-          premium, coverage_type, next_due_date, payment_method, status, now))
-    conn.commit()
-    conn.close()
+    with _conn() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
+        c.execute("""
+            INSERT INTO customer_policies(
+                customer_email, policy_number, first_name, last_name, 
+                premium, coverage_type, next_due_date, payment_method, 
+                status, created_at
+            ) VALUES(?,?,?,?,?,?,?,?,?,?)
+        """, (customer_email.lower(), policy_number, first_name, last_name, 
+              premium, coverage_type, next_due_date, payment_method, status, now))
+        conn.commit()
 
 def update_policy_status(policy_number: str, status: str):
     """Update policy status (active/inactive)"""
-    conn = _conn()
-    c = conn.cursor()
-    c.execute("UPDATE customer_policies SET status = ? WHERE policy_number = ?", 
-              (status, policy_number))
-    conn.commit()
-    conn.close()
+    with _conn() as conn:
+        c = conn.cursor()
+        c.execute("UPDATE customer_policies SET status = ? WHERE policy_number = ?", 
+                  (status, policy_number))
+        conn.commit()
 
 def seed_customer_policies():
     """Seed realistic P&C insurance policies"""
@@ -353,20 +383,20 @@ def seed_pc_policies():
         }
     ]
     
-    conn = _conn()
-    c = conn.cursor()
-    now = datetime.utcnow().isoformat()
+    with _conn() as conn:
+        c = conn.cursor()
+        now = datetime.utcnow().isoformat()
     
-    for policy in pc_policies:
-        c.execute("""
-        INSERT INTO policies(topic, section, classification, text, updated_at)
-        VALUES(?,?,?,?,?)
-        ON CONFLICT(topic) DO UPDATE SET
-          section=excluded.section,
-          classification=excluded.classification,
-          text=excluded.text,
-          updated_at=excluded.updated_at
-        """, (policy["topic"], policy["section"], policy["classification"], policy["text"], now))
+        for policy in pc_policies:
+            c.execute("""
+            INSERT INTO policies(topic, section, classification, text, updated_at)
+            VALUES(?,?,?,?,?)
+            ON CONFLICT(topic) DO UPDATE SET
+              section=excluded.section,
+              classification=excluded.classification,
+              text=excluded.text,
+              updated_at=excluded.updated_at
+            """, (policy["topic"], policy["section"], policy["classification"], policy["text"], now))
     
-    conn.commit()
-    conn.close()
\ No newline at end of file
+        conn.commit()
+    invalidate_policy_cache()
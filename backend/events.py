@@ -0,0 +1,86 @@
+"""
+Cheap event classification for the Realtime proxy.
+
+Most frames on /ws/realtime are audio (`input_audio_buffer.append` from the
+browser, `response.audio.delta` from OpenAI) carrying kilobytes of base64 that
+the proxy never needs to look at. classify() reads the event type with an
+anchored prefix match and only JSON-decodes frames we actually act on.
+"""
+import base64
+import re
+
+try:
+    import orjson
+
+    def loads(message):
+        return orjson.loads(message)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # orjson is optional; stdlib json works, just slower
+    import json
+
+    def loads(message):
+        return json.loads(message)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj)
+
+# Both the browser and the Realtime API serialize "type" as the first key
+_TYPE_RE = re.compile(r'\s*\{\s*"type"\s*:\s*"([^"\\]{1,128})"')
+
+# Relayed untouched; the proxy never inspects their payload
+PASSTHROUGH_EVENTS = {
+    "input_audio_buffer.append",
+    "response.audio.delta",
+    "response.audio_transcript.delta",
+    "response.text.delta",
+    "response.function_call_arguments.delta",
+    "conversation.item.input_audio_transcription.delta",
+}
+
+def peek_type(message: str) -> str | None:
+    m = _TYPE_RE.match(message)
+    return m.group(1) if m else None
+
+def classify(message: str) -> tuple[str, dict | None]:
+    """
+    Return (event_type, data). `data` is None for passthrough events, which
+    are not decoded; every other frame is fully parsed. Raises ValueError on
+    invalid JSON.
+    """
+    event_type = peek_type(message)
+    if event_type in PASSTHROUGH_EVENTS:
+        return event_type, None
+    data = loads(message)
+    if not isinstance(data, dict):
+        raise ValueError("event is not a JSON object")
+    return data.get("type", "unknown"), data
+
+def audio_append(pcm16: bytes) -> str:
+    """Frame raw PCM16 from a binary WebSocket message as an input_audio_buffer.append event"""
+    return '{"type":"input_audio_buffer.append","audio":"' + base64.b64encode(pcm16).decode("ascii") + '"}'
+
+def audio_delta_bytes(message: str) -> bytes:
+    """Raw PCM16 carried by a response.audio.delta event"""
+    return base64.b64decode(loads(message).get("delta", ""))
+
+def merge_audio(first, second, max_bytes: int):
+    """
+    One audio frame carrying `first` then `second`, or None if they can't be
+    merged (different events or items, or the result would exceed max_bytes).
+    Works on raw PCM16 bytes and on input_audio_buffer.append / response.audio.delta events.
+    """
+    if isinstance(first, bytes) or isinstance(second, bytes):
+        if isinstance(first, bytes) and isinstance(second, bytes) and len(first) + len(second) <= max_bytes:
+            return first + second
+        return None
+    a, b = loads(first), loads(second)
+    if a.get("type") != b.get("type") or a.get("item_id") != b.get("item_id"):
+        return None
+    key = "audio" if a.get("type") == "input_audio_buffer.append" else "delta"
+    pcm16 = base64.b64decode(a.get(key, "")) + base64.b64decode(b.get(key, ""))
+    if len(pcm16) > max_bytes:
+        return None
+    a[key] = base64.b64encode(pcm16).decode("ascii")
+    return dumps(a)
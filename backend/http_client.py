@@ -0,0 +1,97 @@
+"""
+App-lifetime pooled HTTP client for calls to the OpenAI REST API.
+
+One httpx.AsyncClient is shared by every request (created on startup, closed
+on shutdown), so minting an ephemeral session reuses a warm keep-alive
+connection instead of paying TCP + TLS on every new voice call. Each request
+is traced to split connection setup time from request time.
+"""
+import threading
+import time
+
+import httpx
+
+from .config import (
+    HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY,
+)
+
+try:
+    import h2  # noqa: F401  (httpx only needs it importable)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: httpx.AsyncClient | None = None
+_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "new_connections": 0,
+    "connect_ms_total": 0.0,
+    "request_ms_total": 0.0,
+    "request_ms_max": 0.0,
+}
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+def start():
+    global _client
+    if _client is None:
+        _client = _new_client()
+
+def get_client() -> httpx.AsyncClient:
+    # Lazily created so scripts that never run the app lifespan still work
+    start()
+    return _client
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    """POST through the shared client, recording connect vs. total request time"""
+    connect = {"start": None, "ms": 0.0}
+
+    async def trace(event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.started":
+            connect["start"] = time.perf_counter()
+        elif event_name in ("connection.start_tls.complete", "connection.connect_tcp.complete") and connect["start"]:
+            connect["ms"] = (time.perf_counter() - connect["start"]) * 1000
+
+    start_time = time.perf_counter()
+    try:
+        response = await get_client().post(url, extensions={"trace": trace}, **kwargs)
+    except httpx.HTTPError:
+        with _lock:
+            _stats["errors"] += 1
+        raise
+    request_ms = (time.perf_counter() - start_time) * 1000
+    with _lock:
+        _stats["requests"] += 1
+        _stats["request_ms_total"] += request_ms
+        _stats["request_ms_max"] = max(_stats["request_ms_max"], request_ms)
+        if connect["start"] is not None:
+            _stats["new_connections"] += 1
+            _stats["connect_ms_total"] += connect["ms"]
+    return response
+
+def stats() -> dict:
+    with _lock:
+        s = dict(_stats)
+    s["http2"] = HTTP2_AVAILABLE
+    s["connection_reuse_rate"] = 1 - s["new_connections"] / s["requests"] if s["requests"] else 0.0
+    s["connect_ms_avg"] = s["connect_ms_total"] / s["new_connections"] if s["new_connections"] else 0.0
+    s["request_ms_avg"] = s["request_ms_total"] / s["requests"] if s["requests"] else 0.0
+    return s
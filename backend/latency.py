@@ -0,0 +1,117 @@
+"""
+Per-connection latency instrumentation for the Realtime proxy.
+
+Each /ws/realtime connection gets a SessionTimeline that timestamps its
+milestones relative to the WebSocket accept (ephemeral session minted,
+upstream connected, session.update sent, first response.audio.delta) and the
+recurring turn timings:
+
+- speech_to_audio: input_audio_buffer.speech_stopped -> first audio of the reply
+- tool_call: one tool call, as the connection saw it (per tool)
+- tool_turnaround: first tool call of a response started -> outputs and response.create sent
+- tool_to_audio: that response.create -> first audio of the reply
+
+Timings go into process-wide histograms, exported at `/metrics` in the
+Prometheus text format, and each connection logs its own summary when it closes.
+"""
+import threading
+import time
+
+from . import logs, metrics
+
+logger = logs.get_logger("latency")
+
+MILESTONES = ("minted", "upstream_connected", "session_update_sent", "first_audio")
+
+_milestones = {m: metrics.Histogram() for m in MILESTONES}
+_speech_to_audio = metrics.Histogram()
+_tool_turnaround = metrics.Histogram()
+_tool_to_audio = metrics.Histogram()
+_tool_calls: dict[str, metrics.Histogram] = {}
+_lock = threading.Lock()
+_sessions = {"active": 0, "total": 0}
+
+def _tool_histogram(name: str) -> metrics.Histogram:
+    with _lock:
+        if name not in _tool_calls:
+            _tool_calls[name] = metrics.Histogram()
+        return _tool_calls[name]
+
+def _ms_since(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+class SessionTimeline:
+    def __init__(self):
+        self.accepted = time.perf_counter()
+        self.marks: dict[str, float] = {}
+        self.tool_calls = 0
+        self._speech_stopped: float | None = None
+        self._batch_started: float | None = None
+        self._tools_answered: float | None = None
+        with _lock:
+            _sessions["active"] += 1
+            _sessions["total"] += 1
+
+    def mark(self, milestone: str):
+        """Record a once-per-connection milestone (ms since accept); repeats are ignored"""
+        if milestone not in self.marks:
+            self.marks[milestone] = _ms_since(self.accepted)
+            _milestones[milestone].observe(self.marks[milestone])
+
+    def speech_stopped(self):
+        self._speech_stopped = time.perf_counter()
+
+    def audio_delta(self):
+        """Called for every response.audio.delta; only the first of a reply is timed"""
+        if "first_audio" not in self.marks:
+            self.mark("first_audio")
+        if self._speech_stopped is not None:
+            _speech_to_audio.observe(_ms_since(self._speech_stopped))
+            self._speech_stopped = None
+        if self._tools_answered is not None:
+            _tool_to_audio.observe(_ms_since(self._tools_answered))
+            self._tools_answered = None
+
+    def tool_started(self) -> float:
+        started = time.perf_counter()
+        if self._batch_started is None:
+            self._batch_started = started
+        return started
+
+    def tool_finished(self, name: str, started: float):
+        self.tool_calls += 1
+        _tool_histogram(name).observe(_ms_since(started))
+
+    def tools_answered(self):
+        """Outputs and response.create for a response's tool calls were sent"""
+        if self._batch_started is not None:
+            _tool_turnaround.observe(_ms_since(self._batch_started))
+            self._batch_started = None
+        self._tools_answered = time.perf_counter()
+
+    def close(self):
+        with _lock:
+            _sessions["active"] -= 1
+        timings = ", ".join(f"{m} {self.marks[m]:.0f}ms" for m in MILESTONES if m in self.marks)
+        logger.info("⏱️ Session timings: %s; %d tool call(s), %.1fs total",
+                    timings or "none", self.tool_calls, _ms_since(self.accepted) / 1000)
+
+def exposition() -> str:
+    """All proxy latency histograms and session counts in the Prometheus text format"""
+    with _lock:
+        sessions = dict(_sessions)
+        tool_calls = sorted(_tool_calls.items())
+    return "".join([
+        metrics.scalar("voice_agent_sessions_active", "Open /ws/realtime connections", "gauge", sessions["active"]),
+        metrics.scalar("voice_agent_sessions_total", "/ws/realtime connections accepted", "counter", sessions["total"]),
+        metrics.exposition("voice_agent_session_milestone_ms", "Milliseconds from WebSocket accept to each milestone",
+                           [({"milestone": m}, _milestones[m]) for m in MILESTONES]),
+        metrics.exposition("voice_agent_speech_to_audio_ms", "speech_stopped to first audio delta of the reply",
+                           [({}, _speech_to_audio)]),
+        metrics.exposition("voice_agent_tool_call_ms", "Tool call duration as seen by the connection",
+                           [({"tool": name}, h) for name, h in tool_calls]),
+        metrics.exposition("voice_agent_tool_turnaround_ms", "First tool call started to outputs and response.create sent",
+                           [({}, _tool_turnaround)]),
+        metrics.exposition("voice_agent_tool_to_audio_ms", "response.create after tool outputs to first audio delta",
+                           [({}, _tool_to_audio)]),
+    ])
@@ -0,0 +1,108 @@
+"""
+Leveled, non-blocking logging for the backend.
+
+Records go through a QueueHandler, and a QueueListener thread does the actual
+stream writes, so logging from the event loop never blocks on stdout.
+High-frequency Realtime events (audio appends/deltas) are sampled per event
+type, and verification fields are redacted before they reach a handler.
+"""
+import logging
+import logging.handlers
+import queue
+import threading
+
+from .config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_AUDIO_SAMPLE_EVERY
+
+# Realtime events that arrive many times per second per caller
+HIGH_FREQUENCY_EVENTS = {
+    "input_audio_buffer.append",
+    "response.audio.delta",
+    "response.audio_transcript.delta",
+    "response.text.delta",
+    "response.function_call_arguments.delta",
+    "conversation.item.input_audio_transcription.delta",
+}
+
+_listener: logging.handlers.QueueListener | None = None
+_lock = threading.Lock()
+_counters: dict[str, int] = {}
+
+class _DropWhenFullQueueHandler(logging.handlers.QueueHandler):
+    """Never block the caller: if the queue is full, the record is dropped."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DropWhenFullQueueHandler.dropped += 1
+
+def configure():
+    """Install the queue handler on the `voice_agent` logger (idempotent)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        stream = logging.StreamHandler()
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root = logging.getLogger("voice_agent")
+        root.setLevel(LOG_LEVEL.upper())
+        root.addHandler(_DropWhenFullQueueHandler(q))
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+        _listener.start()
+
+def shutdown():
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"voice_agent.{name}")
+
+def should_log_event(event_type: str) -> bool:
+    """Sample high-frequency event types (1 in LOG_AUDIO_SAMPLE_EVERY); log everything else."""
+    if event_type not in HIGH_FREQUENCY_EVENTS:
+        return True
+    n = _counters.get(event_type, 0)
+    _counters[event_type] = n + 1
+    return n % LOG_AUDIO_SAMPLE_EVERY == 0
+
+def log_event(logger: logging.Logger, direction: str, event_type: str):
+    """Debug-log a relayed Realtime event, sampling the high-frequency ones"""
+    if logger.isEnabledFor(logging.DEBUG) and should_log_event(event_type):
+        logger.debug("%s %s", direction, event_type)
+
+def stats() -> dict:
+    return {"dropped": _DropWhenFullQueueHandler.dropped, "high_frequency_events_seen": dict(_counters)}
+
+# ===== PII redaction =====
+def redact_email(email: str) -> str:
+    if not email:
+        return ""
+    local, _, domain = email.strip().partition("@")
+    return f"{local[:1]}***@{domain}" if domain else f"{local[:1]}***"
+
+def redact_name(name: str) -> str:
+    return " ".join(f"{part[:1]}***" for part in (name or "").split())
+
+def redact_secret(value: str) -> str:
+    return "****" if value else ""
+
+_REDACTORS = {
+    "email": redact_email,
+    "customer_email": redact_email,
+    "full_name": redact_name,
+    "customer_name": redact_name,
+    "last4": redact_secret,
+    "order_id": redact_secret,
+}
+
+def redact(fields: dict) -> dict:
+    """Copy of `fields` with verification/PII values masked"""
+    return {k: _REDACTORS[k](v) if k in _REDACTORS and isinstance(v, str) else v
+            for k, v in fields.items()}
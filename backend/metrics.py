@@ -0,0 +1,93 @@
+"""
+Small in-process metric types shared by the backend's stats endpoints and
+the Prometheus `/metrics` export.
+"""
+import bisect
+import threading
+
+# Milliseconds; suited to tool calls and other request-scale latencies
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Estimated tokens; sized for tool outputs fed back to the model
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (Prometheus-style `le` buckets)"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+            self._max = max(self._max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, capped at the largest value seen"""
+        with self._lock:
+            counts, total, top = list(self._counts), self._count, self._max
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return min(self.buckets[i], top) if i < len(self.buckets) else top
+        return top
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, s, top = list(self._counts), self._count, self._sum, self._max
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets + ("+Inf",), counts):
+            running += c
+            cumulative[str(bound)] = running
+        return {
+            "count": total,
+            "sum": s,
+            "avg": s / total if total else 0.0,
+            "max": top,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels: dict) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+def exposition(name: str, help_text: str, series: list) -> str:
+    """One histogram family in the Prometheus text format; `series` is [(labels dict, Histogram)]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        snap = histogram.snapshot()
+        base = _labels(labels)
+        sep = "," if base else ""
+        for bound, count in snap["buckets"].items():
+            lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+        suffix = f"{{{base}}}" if base else ""
+        lines.append(f"{name}_sum{suffix} {snap['sum']:.3f}")
+        lines.append(f"{name}_count{suffix} {snap['count']}")
+    return "\n".join(lines) + "\n"
+
+def labeled(name: str, help_text: str, kind: str, series: list) -> str:
+    """A gauge or counter family in the Prometheus text format; `series` is [(labels dict, value)]"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in series:
+        lines.append(f"{name}{{{_labels(labels)}}} {value}" if labels else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+def scalar(name: str, help_text: str, kind: str, value: float) -> str:
+    """A single gauge or counter in the Prometheus text format"""
+    return labeled(name, help_text, kind, [({}, value)])
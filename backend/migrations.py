@@ -0,0 +1,115 @@
+"""
+Schema migrations, applied in order by db.init_db().
+
+The schema version lives in SQLite's `PRAGMA user_version`; each migration
+runs in its own transaction and bumps it, so re-running init_db is a no-op
+once a database is current. Append new migrations to MIGRATIONS — never
+reorder or edit ones that have shipped.
+"""
+import sqlite3
+
+from . import logs
+
+logger = logs.get_logger("migrations")
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def normalize_name(name: str) -> str:
+    """Stored in customers.name_norm by every writer (SQLite's lower() only folds ASCII, so this is done in Python)"""
+    return name.strip().lower().replace("grey", "gray")
+
+def fill_customer_norms(conn: sqlite3.Connection) -> int:
+    """Fill email_norm/name_norm for customers written without them (manual SQL, older
+    writers); finds them through the email_norm index. Returns the rows filled."""
+    rows = conn.execute("SELECT id, email, full_name FROM customers WHERE email_norm IS NULL").fetchall()
+    if rows:
+        conn.executemany("UPDATE customers SET email_norm = ?, name_norm = ? WHERE id = ?",
+                         [(normalize_email(email or ""), normalize_name(name or ""), id_) for id_, email, name in rows])
+        conn.commit()
+        logger.info("📦 Normalized %d customer row(s) written without normalized columns", len(rows))
+    return len(rows)
+
+def _customer_policies_email_index(c: sqlite3.Cursor):
+    c.execute("""
+    CREATE INDEX IF NOT EXISTS idx_customer_policies_email
+    ON customer_policies(customer_email, created_at DESC)""")
+
+def _customers_normalized_columns(c: sqlite3.Cursor):
+    c.execute("ALTER TABLE customers ADD COLUMN email_norm TEXT")
+    c.execute("ALTER TABLE customers ADD COLUMN name_norm TEXT")
+    c.execute("""
+    UPDATE customers SET
+      email_norm = lower(trim(email)),
+      name_norm = replace(lower(trim(full_name)), 'grey', 'gray')""")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customers_email_norm ON customers(email_norm)")
+    # Keep the normalized columns correct for every writer, including init_db.py
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS customers_norm_ai AFTER INSERT ON customers BEGIN
+      UPDATE customers SET
+        email_norm = lower(trim(new.email)),
+        name_norm = replace(lower(trim(new.full_name)), 'grey', 'gray')
+      WHERE id = new.id;
+    END""")
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS customers_norm_au AFTER UPDATE OF email, full_name ON customers BEGIN
+      UPDATE customers SET
+        email_norm = lower(trim(new.email)),
+        name_norm = replace(lower(trim(new.full_name)), 'grey', 'gray')
+      WHERE id = new.id;
+    END""")
+
+def _customers_normalize_in_python(c: sqlite3.Cursor):
+    # The triggers' lower() left non-ASCII letters as they were ("Élodie" never matched "élodie");
+    # writers now fill the columns with normalize_email/normalize_name instead
+    c.execute("DROP TRIGGER IF EXISTS customers_norm_ai")
+    c.execute("DROP TRIGGER IF EXISTS customers_norm_au")
+    rows = c.execute("SELECT id, email, full_name FROM customers").fetchall()
+    c.executemany("UPDATE customers SET email_norm = ?, name_norm = ? WHERE id = ?",
+                  [(normalize_email(email or ""), normalize_name(name or ""), id_) for id_, email, name in rows])
+
+def _policies_version_counter(c: sqlite3.Cursor):
+    # Bumped by every write to policies, whichever process or tool makes it, so each worker's
+    # policy cache can tell that another one changed the table (see db._sync_policy_cache)
+    c.execute("CREATE TABLE IF NOT EXISTS data_versions(name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    c.execute("INSERT OR IGNORE INTO data_versions(name, version) VALUES('policies', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS policies_version_{event.lower()} AFTER {event} ON policies BEGIN
+          UPDATE data_versions SET version = version + 1 WHERE name = 'policies';
+        END""")
+
+MIGRATIONS = [
+    ("customer_policies_email_index", _customer_policies_email_index),
+    ("customers_normalized_columns", _customers_normalized_columns),
+    ("customers_normalize_in_python", _customers_normalize_in_python),
+    ("policies_version_counter", _policies_version_counter),
+]
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run(conn: sqlite3.Connection, target: int | None = None) -> list[str]:
+    """Apply pending migrations up to `target` (default: all). Returns the names applied."""
+    target = len(MIGRATIONS) if target is None else target
+    applied = []
+    version = current_version(conn)
+    for number, (name, migrate) in enumerate(MIGRATIONS[:target], start=1):
+        if number <= version:
+            continue
+        try:
+            # Take the write lock before re-reading the version: with several
+            # workers starting at once, only one of them applies each migration
+            conn.execute("BEGIN IMMEDIATE")
+            if current_version(conn) >= number:
+                conn.execute("ROLLBACK")
+                continue
+            migrate(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        applied.append(name)
+        logger.info("📦 Applied migration %d: %s", number, name)
+    return applied
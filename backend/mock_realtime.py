@@ -0,0 +1,310 @@
+"""
+Local stand-in for the OpenAI Realtime API, for offline load and latency testing.
+
+Serves `POST /v1/realtime/sessions` (mints fake ephemeral sessions) and the
+`/v1/realtime` WebSocket. Each response plays the next turn of a script:
+
+- {"say": "..."}: audio deltas paced in real time, interleaved with
+  transcript deltas (about 60ms of audio per character unless "audio_ms" is set)
+- {"calls": [{"name": ..., "arguments": {...}}]}: function calls, announced by
+  response.function_call_arguments.done and again in response.done
+- {"disconnect": 1011}: drop the connection with that close code (tests upstream reconnects)
+
+Server VAD is emulated: once a client has appended `--speech-ms` of audio the
+mock commits it, interrupts any response still playing and starts the next
+one on its own. The time from a
+response.done carrying function calls to the client's response.create after
+the outputs is recorded as the tool round trip and served at `GET /stats`.
+
+    python -m backend.mock_realtime --port 8765 [--script turns.json] [--speed 1.0]
+    REALTIME_SESSIONS_URL=http://127.0.0.1:8765/v1/realtime/sessions \\
+    REALTIME_WS_URL=ws://127.0.0.1:8765/v1/realtime uvicorn backend.main:app
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import secrets
+import time
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+
+from . import events, logs, metrics
+
+logger = logs.get_logger("mock_realtime")
+
+# PCM16 mono at 24kHz, the Realtime API's default audio format
+SAMPLE_RATE = 24000
+BYTES_PER_MS = SAMPLE_RATE * 2 // 1000
+MS_PER_CHAR = 60
+
+DEFAULT_SCRIPT = [
+    {"say": "Hi there! I'm Alex, your insurance specialist. What can I help you with today?"},
+    {"calls": [{"name": "verify_customer",
+                "arguments": {"email": "maria92@example.com", "full_name": "Heather Gray", "last4": "1234"}}]},
+    {"say": "Great, you're all verified. How can I help you?"},
+    {"calls": [{"name": "get_customer_policies", "arguments": {"email": "maria92@example.com"}},
+               {"name": "get_pc_coverage_info", "arguments": {"coverage_type": "auto"}}]},
+    {"say": "Your auto policy is active, with a premium of eighteen forty-seven fifty due on March fifteenth."},
+]
+
+class MockRealtime:
+    def __init__(self, script: list | None = None, speed: float = 1.0, chunk_ms: int = 50,
+                 speech_ms: int = 1000, session_ttl: int = 60, timestamps: bool = False):
+        self.script = script or DEFAULT_SCRIPT
+        # Stamp every event with "sent_at" (wall clock) so clients on the same host can measure relay latency
+        self.timestamps = timestamps
+        # 1.0 plays audio in real time, 2.0 twice as fast, 0 sends it as fast as possible
+        self.speed = speed
+        self.chunk_ms = chunk_ms
+        self.speech_bytes = speech_ms * BYTES_PER_MS
+        self.session_ttl = session_ttl
+        self._silence = base64.b64encode(bytes(chunk_ms * BYTES_PER_MS)).decode()
+        self._ids = itertools.count(1)
+        self.tool_roundtrip = metrics.Histogram()
+        self.counts = {"sessions_minted": 0, "connections": 0, "active": 0, "responses": 0,
+                       "cancelled": 0, "audio_deltas": 0, "function_calls": 0, "function_outputs": 0,
+                       "disconnects": 0}
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids):08d}"
+
+    def mint_session(self, body: dict) -> dict:
+        self.counts["sessions_minted"] += 1
+        return {
+            "id": self.new_id("sess"),
+            "object": "realtime.session",
+            "model": body.get("model"),
+            "voice": body.get("voice"),
+            "expires_at": int(time.time()) + self.session_ttl,
+            "client_secret": {"value": "ek_mock_" + secrets.token_urlsafe(16),
+                              "expires_at": int(time.time()) + self.session_ttl},
+        }
+
+    def stats(self) -> dict:
+        return {**self.counts, "tool_roundtrip_ms": self.tool_roundtrip.snapshot()}
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        self.counts["connections"] += 1
+        self.counts["active"] += 1
+        try:
+            await MockConnection(self, websocket).run()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.counts["active"] -= 1
+
+class MockConnection:
+    """One Realtime session: a receive loop plus at most one response being played"""
+
+    def __init__(self, mock: MockRealtime, websocket: WebSocket):
+        self.mock = mock
+        self.ws = websocket
+        self.turns = itertools.cycle(mock.script)
+        self.response: asyncio.Task | None = None
+        self.buffered = 0
+        self.pending_calls: set = set()
+        self.calls_done_at = 0.0
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, event_type: str, **fields):
+        # "type" first, as the real API does (the proxy classifies frames by prefix)
+        event = {"type": event_type, "event_id": self.mock.new_id("event")}
+        if self.mock.timestamps:
+            event["sent_at"] = time.time()
+        message = events.dumps({**event, **fields})
+        async with self._send_lock:
+            await self.ws.send_text(message)
+
+    async def run(self):
+        await self.send("session.created", session={"id": self.mock.new_id("sess"), "object": "realtime.session"})
+        try:
+            while True:
+                message = await self.ws.receive_text()
+                try:
+                    event_type, data = events.classify(message)
+                except ValueError:
+                    await self.send("error", error={"type": "invalid_request_error", "message": "Invalid JSON"})
+                    continue
+                await self.handle(event_type, data, message)
+        finally:
+            if self.response is not None:
+                self.response.cancel()
+
+    async def handle(self, event_type: str, data: dict | None, message: str):
+        if event_type == "input_audio_buffer.append":
+            # Approximate decoded size from the base64 length; no need to decode silence
+            self.buffered += len(message) * 3 // 4
+            if self.buffered >= self.mock.speech_bytes:
+                await self.commit_speech()
+        elif event_type == "input_audio_buffer.commit":
+            await self.commit_speech(auto_respond=False)
+        elif event_type == "input_audio_buffer.clear":
+            self.buffered = 0
+            await self.send("input_audio_buffer.cleared")
+        elif event_type == "session.update":
+            await self.send("session.updated", session=data.get("session", {}))
+        elif event_type == "conversation.item.create":
+            item = data.get("item", {})
+            if item.get("type") == "function_call_output":
+                self.mock.counts["function_outputs"] += 1
+                self.pending_calls.discard(item.get("call_id"))
+            await self.send("conversation.item.created", item={"id": self.mock.new_id("item"), **item})
+        elif event_type == "response.create":
+            if self.calls_done_at and not self.pending_calls:
+                self.mock.tool_roundtrip.observe((time.perf_counter() - self.calls_done_at) * 1000)
+                self.calls_done_at = 0.0
+            await self.start_response()
+        elif event_type == "response.cancel":
+            if self.response is not None and not self.response.done():
+                self.response.cancel()
+
+    async def commit_speech(self, auto_respond: bool = True):
+        item_id = self.mock.new_id("item")
+        self.buffered = 0
+        await self.send("input_audio_buffer.speech_started", item_id=item_id, audio_start_ms=0)
+        if auto_respond and self.response is not None and not self.response.done():
+            # Barge-in: server VAD interrupts the response being played
+            self.response.cancel()
+            await asyncio.wait([self.response])
+        await self.send("input_audio_buffer.speech_stopped", item_id=item_id, audio_end_ms=0)
+        await self.send("input_audio_buffer.committed", item_id=item_id, previous_item_id=None)
+        await self.send("conversation.item.created",
+                        item={"id": item_id, "type": "message", "role": "user", "content": [{"type": "input_audio"}]})
+        if auto_respond:
+            await self.start_response()
+
+    async def start_response(self):
+        if self.response is not None and not self.response.done():
+            await self.send("error", error={"type": "invalid_request_error", "code": "conversation_already_has_active_response",
+                                            "message": "Conversation already has an active response"})
+            return
+        self.mock.counts["responses"] += 1
+        self.response = asyncio.create_task(self.play(next(self.turns)))
+
+    async def play(self, turn: dict):
+        if "disconnect" in turn:
+            self.mock.counts["disconnects"] += 1
+            await self.ws.close(code=turn["disconnect"])
+            return
+        response_id = self.mock.new_id("resp")
+        await self.send("response.created", response={"id": response_id, "object": "realtime.response",
+                                                      "status": "in_progress", "output": []})
+        output = []
+        status = "completed"
+        try:
+            if "calls" in turn:
+                for index, call in enumerate(turn["calls"]):
+                    output.append(await self.play_call(response_id, index, call))
+            else:
+                output.append(await self.play_speech(response_id, turn))
+        except asyncio.CancelledError:
+            status = "cancelled"
+            self.mock.counts["cancelled"] += 1
+        try:
+            await self.send("response.done", response={"id": response_id, "object": "realtime.response",
+                                                       "status": status, "output": output})
+        except Exception:
+            return  # cancelled because the client went away
+        calls = {item["call_id"] for item in output if item["type"] == "function_call"}
+        if calls and status == "completed":
+            self.pending_calls = calls
+            self.calls_done_at = time.perf_counter()
+
+    async def play_call(self, response_id: str, index: int, call: dict) -> dict:
+        item_id, call_id = self.mock.new_id("item"), self.mock.new_id("call")
+        arguments = json.dumps(call.get("arguments", {}))
+        item = {"id": item_id, "object": "realtime.item", "type": "function_call", "status": "in_progress",
+                "name": call["name"], "call_id": call_id, "arguments": ""}
+        await self.send("response.output_item.added", response_id=response_id, output_index=index, item=item)
+        await self.send("response.function_call_arguments.delta", response_id=response_id, item_id=item_id,
+                        output_index=index, call_id=call_id, delta=arguments)
+        await self.send("response.function_call_arguments.done", response_id=response_id, item_id=item_id,
+                        output_index=index, call_id=call_id, name=call["name"], arguments=arguments)
+        item = {**item, "status": "completed", "arguments": arguments}
+        await self.send("response.output_item.done", response_id=response_id, output_index=index, item=item)
+        self.mock.counts["function_calls"] += 1
+        return item
+
+    async def play_speech(self, response_id: str, turn: dict) -> dict:
+        item_id = self.mock.new_id("item")
+        text = turn.get("say", "")
+        ids = {"response_id": response_id, "item_id": item_id, "output_index": 0, "content_index": 0}
+        item = {"id": item_id, "object": "realtime.item", "type": "message", "role": "assistant",
+                "status": "in_progress", "content": []}
+        await self.send("response.output_item.added", response_id=response_id, output_index=0, item=item)
+        await self.send("response.content_part.added", **ids, part={"type": "audio", "transcript": ""})
+
+        # One transcript word per chunk while they last, like the real stream
+        chunks = max(1, int(turn.get("audio_ms", len(text) * MS_PER_CHAR)) // self.mock.chunk_ms)
+        words = [w + " " for w in text.split()]
+        started = time.perf_counter()
+        for i in range(chunks):
+            if self.mock.speed > 0:
+                # Paced against the start time so per-chunk overhead doesn't accumulate as drift
+                due = started + i * self.mock.chunk_ms / 1000 / self.mock.speed
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await self.send("response.audio.delta", **ids, delta=self.mock._silence)
+            self.mock.counts["audio_deltas"] += 1
+            if i < len(words):
+                await self.send("response.audio_transcript.delta", **ids, delta=words[i])
+        for word in words[chunks:]:
+            await self.send("response.audio_transcript.delta", **ids, delta=word)
+
+        await self.send("response.audio.done", **ids)
+        await self.send("response.audio_transcript.done", **ids, transcript=text)
+        part = {"type": "audio", "transcript": text}
+        await self.send("response.content_part.done", **ids, part=part)
+        item = {**item, "status": "completed", "content": [part]}
+        await self.send("response.output_item.done", response_id=response_id, output_index=0, item=item)
+        return item
+
+def create_app(mock: MockRealtime) -> FastAPI:
+    app = FastAPI(title="Mock Realtime API")
+
+    @app.post("/v1/realtime/sessions")
+    async def sessions(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        return mock.mint_session(body if isinstance(body, dict) else {})
+
+    @app.websocket("/v1/realtime")
+    async def realtime(websocket: WebSocket):
+        await mock.serve(websocket)
+
+    @app.get("/stats")
+    def stats():
+        return mock.stats()
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Scripted stand-in for the OpenAI Realtime API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with a list of turns (default: built-in verify/policies call)")
+    parser.add_argument("--speed", type=float, default=1.0, help="audio pacing, 1.0 = real time, 0 = unpaced")
+    parser.add_argument("--chunk-ms", type=int, default=50, help="audio per response.audio.delta")
+    parser.add_argument("--speech-ms", type=int, default=1000, help="appended audio that counts as one user turn")
+    parser.add_argument("--timestamps", action="store_true", help="add a sent_at wall-clock stamp to every event")
+    args = parser.parse_args()
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+    logs.configure()
+    mock = MockRealtime(script, args.speed, args.chunk_ms, args.speech_ms, timestamps=args.timestamps)
+    logger.info("🎭 Mock Realtime API on %s:%d (%d turns, speed %.1f)", args.host, args.port, len(mock.script), args.speed)
+    try:
+        uvicorn.run(create_app(mock), host=args.host, port=args.port, log_level="warning")
+    finally:
+        logs.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import (
+    DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_SYNCHRONOUS,
+    DB_MMAP_SIZE, DB_CACHE_SIZE, DB_STATEMENT_CACHE,
+)
+
+class PoolTimeout(RuntimeError):
+    pass
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections.
+    Connections are opened lazily up to `size`, tuned once with WAL pragmas,
+    and reused so the page cache and prepared statement cache stay warm.
+    """
+
+    def __init__(self, path: str, size: int = 8, timeout: float = 5.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_total_ms": 0.0,
+            "wait_max_ms": 0.0,
+        }
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size={int(DB_CACHE_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait(), False
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise PoolTimeout("connection pool is closed")
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open(), False
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout), True
+        except queue.Empty:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"no database connection available after {self.timeout}s")
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        start = time.perf_counter()
+        conn, waited = self._acquire()
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_total_ms"] += wait_ms
+            if waited:
+                self._stats["waits"] += 1
+            if wait_ms > self._stats["wait_max_ms"]:
+                self._stats["wait_max_ms"] = wait_ms
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            opened = self._opened
+        s["size"] = self.size
+        s["opened"] = opened
+        s["idle"] = self._idle.qsize()
+        s["in_use"] = opened - s["idle"]
+        s["wait_avg_ms"] = s["wait_total_ms"] / s["checkouts"] if s["checkouts"] else 0.0
+        return s
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT)
+    return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,155 @@
+"""
+Session profile registry.
+
+A profile bundles everything the proxy sends in `session.update` (instructions,
+voice, VAD thresholds, tool set, sampling settings). Profiles are defined in
+session_profiles/profiles.json, may `extend` another profile, and reference
+tools by name; their schemas come from the tool registry (tools.py).
+
+Everything is loaded and serialized once: a connection just takes the cached
+`session.update` frame. The source files are re-checked at most every
+PROFILE_RELOAD_INTERVAL seconds and reloaded when they change; a broken edit
+is logged and the previous profiles stay in service.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from . import logs, tools
+from .config import (
+    SESSION_PROFILES_PATH, DEFAULT_PROFILE, PROFILE_RELOAD_INTERVAL,
+    REALTIME_MODEL, REALTIME_VOICE,
+)
+
+logger = logs.get_logger("profiles")
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    voice: str
+    instructions: str
+    tools: list
+    session: dict
+    # Pre-serialized {"type": "session.update", ...} frame, sent as-is on connect
+    session_update: str
+    # Body for the ephemeral session (client secret) request
+    ephemeral_body: dict
+
+def _deep_merge(base: dict, override: dict) -> dict:
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+class ProfileRegistry:
+    def __init__(self, path: str, reload_interval: float = 2.0):
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path))
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._profiles: dict[str, Profile] = {}
+        self._mtimes: dict[str, float] = {}
+        self._checked_at = 0.0
+        self.version = 0
+
+    def _read(self, relpath: str, mtimes: dict) -> str:
+        path = os.path.join(self.base_dir, relpath)
+        with open(path, encoding="utf-8") as f:
+            mtimes[path] = os.path.getmtime(path)
+            return f.read()
+
+    def _resolve(self, name: str, raw: dict, seen: tuple = ()) -> dict:
+        spec = raw[name]
+        parent = spec.get("extends")
+        if not parent:
+            return spec
+        if parent in seen or parent not in raw:
+            raise ValueError(f"profile {name!r} extends unknown or circular profile {parent!r}")
+        merged = _deep_merge(self._resolve(parent, raw, seen + (name,)), spec)
+        merged.pop("extends", None)
+        return merged
+
+    def _build(self, name: str, spec: dict, mtimes: dict) -> Profile:
+        instructions = self._read(spec["instructions_file"], mtimes).rstrip("\n")
+        try:
+            tool_schemas = tools.registry.schemas(spec.get("tools", []))
+        except KeyError as e:
+            raise ValueError(f"profile {name!r} references unknown tool {e}")
+        voice = spec.get("voice", REALTIME_VOICE)
+        session = {**spec.get("session", {}), "instructions": instructions, "voice": voice, "tools": tool_schemas}
+        return Profile(
+            name=name,
+            voice=voice,
+            instructions=instructions,
+            tools=tool_schemas,
+            session=session,
+            session_update=json.dumps({"type": "session.update", "session": session}),
+            ephemeral_body={
+                "model": REALTIME_MODEL,
+                "voice": voice,
+                "modalities": ["audio", "text"],
+                "input_audio_format": "pcm16",
+                "tools": tool_schemas,
+            },
+        )
+
+    def reload(self):
+        mtimes = {}
+        try:
+            raw = json.loads(self._read(os.path.basename(self.path), mtimes))
+            profiles = {name: self._build(name, self._resolve(name, raw), mtimes) for name in raw}
+            if DEFAULT_PROFILE not in profiles:
+                raise ValueError(f"default profile {DEFAULT_PROFILE!r} is not defined in {self.path}")
+        except Exception:
+            # Remember what was read so a broken file is not retried until it changes again
+            self._mtimes.update(mtimes)
+            raise
+        with self._lock:
+            self._profiles = profiles
+            self._mtimes = mtimes
+            self.version += 1
+        logger.info("📋 Loaded %d session profile(s): %s", len(profiles), ", ".join(profiles))
+
+    def _changed(self) -> bool:
+        for path, mtime in self._mtimes.items():
+            try:
+                if os.path.getmtime(path) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _maybe_reload(self):
+        if not self._profiles:
+            # First use loads synchronously and raises on error
+            with self._lock:
+                if not self._profiles:
+                    self._checked_at = time.monotonic()
+                    self.reload()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        if self._changed():
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error("❌ Session profile reload failed, keeping previous profiles: %s", e)
+
+    def get(self, name: str | None = None) -> Profile:
+        """Profile by name (default profile when None); raises KeyError for unknown names"""
+        self._maybe_reload()
+        return self._profiles[name or DEFAULT_PROFILE]
+
+    def names(self) -> list[str]:
+        self._maybe_reload()
+        return sorted(self._profiles)
+
+registry = ProfileRegistry(SESSION_PROFILES_PATH, PROFILE_RELOAD_INTERVAL)
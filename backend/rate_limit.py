@@ -0,0 +1,25 @@
+"""
+Fixed-window rate limits kept in the session store.
+
+Counters live wherever session state lives, so with SESSION_STORE=redis a
+limit holds across every worker process instead of per process.
+"""
+import time
+
+from . import logs, session_store
+
+logger = logs.get_logger("rate_limit")
+
+def hit(scope: str, identity: str, limit: int, window: float) -> bool:
+    """Count one attempt; False once `identity` has used up `limit` attempts in the current window"""
+    if limit <= 0:
+        return True
+    bucket = int(time.time() // window)
+    key = f"ratelimit:{scope}:{identity.strip().lower()}:{bucket}"
+    try:
+        count = session_store.get_store().incr(key, window)
+    except Exception as e:
+        # Fail open: an unreachable store must not lock every caller out
+        logger.warning("⚠️ Rate limit check failed for %s: %s", scope, e)
+        return True
+    return count <= limit
@@ -0,0 +1,194 @@
+"""
+Bounded, observable WebSocket relay for the Realtime proxy.
+
+Each direction of a /ws/realtime connection (browser -> OpenAI "upstream",
+OpenAI -> browser "downstream") gets a RelayQueue: the reader puts messages
+and a writer task sends them, so a slow peer fills that direction's queue
+instead of stalling the reader on the other side.
+
+When a queue is full, audio frames give way according to RELAY_OVERFLOW_POLICY:
+
+- coalesce: merge the frame into the last queued audio frame (no audio lost,
+  fewer sends), up to RELAY_COALESCE_MAX_MS; past that, drop the oldest queued audio
+- drop_oldest: drop the oldest queued audio frame, keeping latency bounded
+- block: wait for room (back-pressure on the reader)
+
+All other events (transcripts, tool calls, response.done...) are never
+dropped; they wait for room if the queue holds no audio to give up.
+
+A monitor task samples event-loop lag and every queue's depth periodically.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+
+from . import events, logs, metrics
+from .config import RELAY_QUEUE_SIZE, RELAY_OVERFLOW_POLICY, RELAY_COALESCE_MAX_MS, RELAY_LAG_INTERVAL
+
+logger = logs.get_logger("relay")
+
+POLICIES = ("coalesce", "drop_oldest", "block")
+DIRECTIONS = ("upstream", "downstream")
+# PCM16 mono at 24kHz
+BYTES_PER_MS = 48
+
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_lock = threading.Lock()
+_counts = {d: {"sent": 0, "dropped": 0, "coalesced": 0, "blocked": 0} for d in DIRECTIONS}
+_depth = {d: metrics.Histogram(DEPTH_BUCKETS) for d in DIRECTIONS}
+_loop_lag = metrics.Histogram(LAG_BUCKETS_MS)
+_queues: weakref.WeakSet = weakref.WeakSet()
+_monitor: asyncio.Task | None = None
+
+def _count(direction: str, key: str, n: int = 1):
+    with _lock:
+        _counts[direction][key] += n
+
+class RelayClosed(ConnectionError):
+    pass
+
+class RelayQueue:
+    def __init__(self, direction: str, send, maxsize: int = RELAY_QUEUE_SIZE, policy: str = RELAY_OVERFLOW_POLICY):
+        """`send(message)` delivers one str/bytes message to the peer"""
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown relay overflow policy: {policy}")
+        self.direction = direction
+        self.send = send
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_audio_bytes = RELAY_COALESCE_MAX_MS * BYTES_PER_MS
+        self._items: deque = deque()  # (message, is_audio)
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._error: Exception | None = None
+        self._warned = False
+        self._writer = asyncio.create_task(self._run())
+        _queues.add(self)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, message, audio: bool = False):
+        """Queue a message; raises RelayClosed once the peer can no longer be written to"""
+        while len(self._items) >= self.maxsize:
+            self._check()
+            outcome = self._overflow(message, audio)
+            if outcome == "queued":
+                break
+            if outcome == "absorbed":
+                return
+            _count(self.direction, "blocked")
+            self._not_full.clear()
+            await self._not_full.wait()
+        self._check()
+        self._items.append((message, audio))
+        self._not_empty.set()
+
+    def _check(self):
+        if self._error is not None:
+            raise RelayClosed(f"{self.direction} relay closed: {self._error}")
+
+    def _overflow(self, message, audio: bool) -> str | None:
+        """Make room in a full queue: "queued" (room made), "absorbed" (merged or dropped), None (wait)"""
+        if self.policy == "block":
+            return None
+        if audio and self.policy == "coalesce" and self._items and self._items[-1][1]:
+            merged = events.merge_audio(self._items[-1][0], message, self.max_audio_bytes)
+            if merged is not None:
+                self._items[-1] = (merged, True)
+                _count(self.direction, "coalesced")
+                return "absorbed"
+        for i, (_, is_audio) in enumerate(self._items):
+            if is_audio:
+                del self._items[i]
+                self._dropped()
+                return "queued"
+        if audio:
+            # Nothing stale to give up; the new frame is the one dropped
+            self._dropped()
+            return "absorbed"
+        return None
+
+    def _dropped(self):
+        _count(self.direction, "dropped")
+        if not self._warned:
+            self._warned = True
+            logger.warning("⚠️ %s relay falling behind (%d queued): dropping stale audio", self.direction, len(self._items))
+
+    async def _run(self):
+        try:
+            while True:
+                while not self._items:
+                    self._not_empty.clear()
+                    await self._not_empty.wait()
+                message, _ = self._items.popleft()
+                self._not_full.set()
+                await self.send(message)
+                _count(self.direction, "sent")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+            self._not_full.set()
+            logger.info("🔌 %s relay stopped: %s", self.direction, e)
+
+    async def closed(self):
+        """Wait until the writer stops (the peer went away)"""
+        await asyncio.wait([self._writer])
+
+    def close(self):
+        self._writer.cancel()
+        self._items.clear()
+
+async def _sample(interval: float):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        _loop_lag.observe(max(0.0, (time.perf_counter() - started - interval) * 1000))
+        for queue in list(_queues):
+            _depth[queue.direction].observe(len(queue))
+
+def start_monitor(interval: float = RELAY_LAG_INTERVAL):
+    global _monitor
+    if _monitor is None and interval > 0:
+        _monitor = asyncio.create_task(_sample(interval))
+
+async def stop_monitor():
+    global _monitor
+    if _monitor is not None:
+        _monitor.cancel()
+        await asyncio.gather(_monitor, return_exceptions=True)
+        _monitor = None
+
+def stats() -> dict:
+    queues = list(_queues)
+    with _lock:
+        counts = {d: dict(c) for d, c in _counts.items()}
+    for d in DIRECTIONS:
+        depths = [len(q) for q in queues if q.direction == d]
+        counts[d]["queues"] = len(depths)
+        counts[d]["depth"] = sum(depths)
+        counts[d]["max_depth"] = max(depths, default=0)
+        counts[d]["depth_samples"] = _depth[d].snapshot()
+    return {"policy": RELAY_OVERFLOW_POLICY, "queue_size": RELAY_QUEUE_SIZE, **counts,
+            "event_loop_lag_ms": _loop_lag.snapshot()}
+
+def exposition() -> str:
+    s = stats()
+    parts = [metrics.exposition("voice_agent_event_loop_lag_ms", "Event loop lag sampled every RELAY_LAG_INTERVAL",
+                                [({}, _loop_lag)]),
+             metrics.exposition("voice_agent_relay_queue_depth", "Relay queue depth, sampled per connection",
+                                [({"direction": d}, _depth[d]) for d in DIRECTIONS])]
+    for key, kind, help_text in (("sent", "counter", "Messages relayed"),
+                                 ("dropped", "counter", "Stale audio frames dropped"),
+                                 ("coalesced", "counter", "Audio frames merged into a queued frame"),
+                                 ("blocked", "counter", "Times a reader waited for queue room"),
+                                 ("depth", "gauge", "Messages queued right now")):
+        parts.append(metrics.labeled(f"voice_agent_relay_{key}" + ("_total" if kind == "counter" else ""),
+                                     help_text, kind, [({"direction": d}, s[d][key]) for d in DIRECTIONS]))
+    return "".join(parts)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Header, Request
 from fastapi.responses import JSONResponse
-from . import db, auth
+from . import db, auth, http_client, logs, profiles, rate_limit, relay, session_pool, session_store, tool_exec, tools, upstream
 from .models import SeedPayload, VerificationRequest, PolicyQuery
-from .config import ADMIN_SECRET
+from .config import ADMIN_SECRET, VERIFY_RATE_LIMIT, VERIFY_RATE_WINDOW
+from .topics import COVERAGE_TYPES
 
 router = APIRouter(prefix="/api", tags=["api"])
 
@@ -21,6 +22,9 @@ def api_seed(payload: SeedPayload):
 
 @router.post("/verify")
 def api_verify(req: VerificationRequest, x_session_id: str = Header(default="anon")):
+    if not rate_limit.hit("verify", req.email, VERIFY_RATE_LIMIT, VERIFY_RATE_WINDOW):
+        db.log("customer", "verification_rate_limited", req.email)
+        raise HTTPException(429, "Too many verification attempts, try again later")
     ok = db.verify_customer(req.email, req.full_name, req.last4, req.order_id)
     if ok:
         auth.set_verified(x_session_id, True)
@@ -57,63 +61,88 @@ def api_policy(q: PolicyQuery, x_session_id: str = Header(default="anon")):
 def api_audits():
     return db.list_audits()
 
+@router.get("/audits/stats")
+def api_audit_stats():
+    """Audit writer counters (queued, flushed, dropped, pending)"""
+    return db.audit_stats()
+
+@router.get("/policy-cache/stats")
+def api_policy_cache_stats():
+    """Policy cache hit/miss/eviction counters"""
+    return db.policy_cache_stats()
+
+@router.get("/logs/stats")
+def api_log_stats():
+    """Dropped log records and high-frequency event counts"""
+    return logs.stats()
+
+@router.get("/http/stats")
+def api_http_stats():
+    """Shared HTTP client timings (connect vs. request) and connection reuse"""
+    return http_client.stats()
+
+@router.get("/db/stats")
+def api_db_stats():
+    """Connection pool stats (checkouts, wait times, connections in use)"""
+    return db.pool_stats()
+
 @router.post("/realtime/session")
 async def api_realtime_session():
     """Create ephemeral session for WebSocket connection"""
-    return await auth.create_ephemeral_session()
+    return await session_pool.ws_sessions.acquire()
 
 @router.get("/realtime/token")
 async def api_realtime_token():
     """Create ephemeral token for WebRTC connection"""
-    import httpx
-    from .config import OPENAI_API_KEY
-    
-    if not OPENAI_API_KEY:
-        raise HTTPException(500, "OPENAI_API_KEY not configured")
-    
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json"
+    return await session_pool.token_sessions.acquire()
+
+@router.get("/session-pool/stats")
+def api_session_pool_stats():
+    """Pre-minted session pool depth and hit rate"""
+    return {
+        "realtime_session": session_pool.ws_sessions.stats(),
+        "realtime_token": session_pool.token_sessions.stats(),
     }
-    
-    # Create ephemeral token for WebRTC - using the sessions endpoint
-    body = {
-        "model": "gpt-4o-realtime-preview-2024-10-01",
-        "voice": "shimmer",
-        "modalities": ["audio", "text"]
+
+@router.get("/session-store/stats")
+def api_session_store_stats():
+    """Session state backend, size, expirations and evictions"""
+    return session_store.get_store().stats()
+
+@router.get("/tools/stats")
+def api_tool_stats():
+    """Per-tool calls, errors, timeouts and latency histograms; duplicates suppressed, batches answered"""
+    return {**tool_exec.stats(), **tools.registry.stats()}
+
+@router.get("/relay/stats")
+def api_relay_stats():
+    """Relay queue depths, dropped/coalesced audio frames and event-loop lag"""
+    return relay.stats()
+
+@router.get("/upstream/stats")
+def api_upstream_stats():
+    """Upstream reconnects, failures, caller audio buffered/dropped during gaps, gap durations"""
+    return upstream.stats()
+
+@router.get("/profiles")
+def api_profiles():
+    """Loaded session profiles (select one with /ws/realtime?profile=<name>)"""
+    return {
+        "default": profiles.registry.get().name,
+        "version": profiles.registry.version,
+        "profiles": {
+            name: {"voice": p.voice, "tools": [t["name"] for t in p.tools], "turn_detection": p.session.get("turn_detection")}
+            for name in profiles.registry.names()
+            for p in [profiles.registry.get(name)]
+        },
     }
-    
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        try:
-            r = await client.post(
-                "https://api.openai.com/v1/realtime/sessions",
-                headers=headers,
-                json=body
-            )
-            r.raise_for_status()
-            result = r.json()
-            
-            print(f"✅ Ephemeral token created: {result}")
-            
-            # Extract client_secret from the response
-            client_secret = result.get('client_secret', {})
-            if isinstance(client_secret, dict):
-                client_secret_value = client_secret.get('value')
-            else:
-                client_secret_value = client_secret
-            
-            if not client_secret_value:
-                raise HTTPException(500, f"No client_secret in response: {result}")
-            
-            return {
-                "client_secret": client_secret_value,
-                "expires_at": result.get("expires_at"),
-                "session_id": result.get("id")
-            }
-        except httpx.HTTPStatusError as e:
-            error_text = e.response.text
-            print(f"❌ Token creation failed: {error_text}")
-            raise HTTPException(status_code=e.response.status_code, detail=f"OpenAI API error: {error_text}")
+
+@router.get("/policy/resolve")
+def api_policy_resolve(q: str):
+    """Resolve a free-form coverage phrase to the best policy topics with confidence scores"""
+    if not q.strip():
+        raise HTTPException(400, "Query must not be empty")
+    return [{"topic": t, "confidence": c} for t, c in db.resolve_topic(q)]
 
 @router.get("/policy/search")
 def api_policy_search(q: str, x_session_id: str = Header(default="anon")):
@@ -121,14 +150,9 @@ def api_policy_search(q: str, x_session_id: str = Header(default="anon")):
     if not q or len(q.strip()) < 2:
         raise HTTPException(400, "Search query must be at least 2 characters")
     
-    # Check verification for internal/restricted policies
-    policies = db.search_policies(q.strip())
-    
-    # Filter out internal/restricted policies if not verified
-    if not auth.is_verified(x_session_id):
-        policies = [p for p in policies if p["classification"] not in ("internal", "restricted")]
-    
-    return policies
+    # Internal/restricted policies are filtered out in the query if not verified
+    hidden = () if auth.is_verified(x_session_id) else ("internal", "restricted")
+    return db.search_policies(q.strip(), exclude_classifications=hidden)
 
 # ===== Customer Policy Details API =====
 @router.get("/customer/{email}/policies")
@@ -193,20 +217,11 @@ def api_get_property_policies(x_session_id: str = Header(default="anon")):
 @router.get("/pc-coverage/{coverage_type}")
 def api_get_coverage_info(coverage_type: str, x_session_id: str = Header(default="anon")):
     """Get P&C coverage information by type"""
-    valid_types = ["auto", "homeowners", "commercial", "liability", "claims"]
+    valid_types = list(COVERAGE_TYPES)
     if coverage_type not in valid_types:
         raise HTTPException(400, f"Coverage type must be one of: {valid_types}")
     
-    # Map coverage types to actual policy topics
-    topic_mapping = {
-        "auto": "auto_coverage_limits",
-        "homeowners": "homeowners_coverage",
-        "commercial": "commercial_liability",
-        "liability": "commercial_liability",
-        "claims": "claims_process"
-    }
-    
-    topic = topic_mapping.get(coverage_type, coverage_type)
+    topic = COVERAGE_TYPES[coverage_type]
     policy = db.get_policy(topic)
     
     if not policy:
@@ -0,0 +1,115 @@
+"""
+Full-text search over policy documents.
+
+Policies are indexed in an FTS5 table (`policies_fts`) that mirrors the
+`policies` table through triggers, so every write path (seed_many,
+seed_pc_policies, ad-hoc updates) keeps the index in sync. Queries are
+tokenized, every token is prefix-matched, and results are ranked by bm25 with
+topic/section matches weighted above body text.
+"""
+import re
+import sqlite3
+
+from . import logs
+
+logger = logs.get_logger("search")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Column weights for bm25(): topic, section, text
+_WEIGHTS = (10.0, 5.0, 1.0)
+
+_fts_available: bool | None = None
+
+_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS policies_fts USING fts5(
+      topic, section, text,
+      content='policies',
+      tokenize='unicode61 remove_diacritics 2',
+      prefix='2 3'
+    )""",
+    """
+    CREATE TRIGGER IF NOT EXISTS policies_fts_ai AFTER INSERT ON policies BEGIN
+      INSERT INTO policies_fts(rowid, topic, section, text)
+      VALUES (new.rowid, new.topic, new.section, new.text);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS policies_fts_ad AFTER DELETE ON policies BEGIN
+      INSERT INTO policies_fts(policies_fts, rowid, topic, section, text)
+      VALUES ('delete', old.rowid, old.topic, old.section, old.text);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS policies_fts_au AFTER UPDATE ON policies BEGIN
+      INSERT INTO policies_fts(policies_fts, rowid, topic, section, text)
+      VALUES ('delete', old.rowid, old.topic, old.section, old.text);
+      INSERT INTO policies_fts(rowid, topic, section, text)
+      VALUES (new.rowid, new.topic, new.section, new.text);
+    END""",
+]
+
+def ensure_index(conn: sqlite3.Connection) -> bool:
+    """Create the FTS table and sync triggers; rebuild if newly created.
+    Returns False when this SQLite build has no FTS5 (LIKE fallback is used)."""
+    global _fts_available
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE name = 'policies_fts'")
+    existed = c.fetchone() is not None
+    try:
+        for stmt in _SCHEMA:
+            c.execute(stmt)
+    except sqlite3.OperationalError as e:
+        logger.warning("⚠️ FTS5 unavailable, policy search falls back to LIKE: %s", e)
+        conn.rollback()
+        _fts_available = False
+        return False
+    if not existed:
+        c.execute("INSERT INTO policies_fts(policies_fts) VALUES('rebuild')")
+    _fts_available = True
+    return True
+
+def rebuild(conn: sqlite3.Connection):
+    conn.execute("INSERT INTO policies_fts(policies_fts) VALUES('rebuild')")
+
+def build_match(query: str) -> str:
+    """'auto cov' -> '"auto"* AND "cov"*'"""
+    tokens = _TOKEN_RE.findall(query.lower().replace("_", " "))
+    return " AND ".join(f'"{t}"*' for t in tokens)
+
+def _exclude_clause(column: str, exclude: tuple) -> str:
+    return f" AND {column} NOT IN ({','.join('?' * len(exclude))})" if exclude else ""
+
+def search(conn: sqlite3.Connection, query: str, limit: int | None = None, exclude: tuple = (),
+           snippets: bool = False):
+    """Best matches first. Classifications in `exclude` are filtered in the query, so
+    `limit` counts only rows the caller may see; `snippets` adds snippet and score"""
+    if _fts_available is False:
+        return like_search(conn, query, limit, exclude)
+    match = build_match(query)
+    if not match:
+        return []
+    rank = f"bm25(policies_fts, {_WEIGHTS[0]}, {_WEIGHTS[1]}, {_WEIGHTS[2]})"
+    extra = f", snippet(policies_fts, 2, '[', ']', '…', 12) AS snippet, {rank} AS score" if snippets else ""
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT p.topic, p.section, p.classification, p.updated_at{extra}
+        FROM policies_fts
+        JOIN policies p ON p.rowid = policies_fts.rowid
+        WHERE policies_fts MATCH ?{_exclude_clause("p.classification", exclude)}
+        ORDER BY {rank}
+        LIMIT ?
+    """, (match, *exclude, -1 if limit is None else limit))
+    return [dict(r) for r in c.fetchall()]
+
+def like_search(conn: sqlite3.Connection, query: str, limit: int | None = None, exclude: tuple = ()):
+    """Substring scan over topic/section/text (the pre-FTS behaviour)"""
+    c = conn.cursor()
+    search_term = f"%{query.strip().lower()}%"
+    c.execute(f"""
+        SELECT topic, section, classification, updated_at
+        FROM policies
+        WHERE (topic LIKE ? OR section LIKE ? OR text LIKE ?){_exclude_clause("classification", exclude)}
+        ORDER BY topic
+        LIMIT ?
+    """, (search_term, search_term, search_term, *exclude, -1 if limit is None else limit))
+    return [dict(r) for r in c.fetchall()]
@@ -0,0 +1,121 @@
+"""
+Pre-minted ephemeral Realtime sessions.
+
+Minting a client secret is a full round trip to the sessions endpoint, and it
+used to sit in front of every /ws/realtime connect and /api/realtime/token
+request. Each SessionPool keeps up to SESSION_POOL_SIZE fresh sessions ready,
+drops them before their `expires_at`, refills in the background, and mints on
+demand when it is empty.
+"""
+import asyncio
+import collections
+import time
+
+from . import auth, logs
+from .config import SESSION_POOL_SIZE, SESSION_POOL_MIN_TTL, SESSION_DEFAULT_TTL
+
+logger = logs.get_logger("session_pool")
+
+class SessionPool:
+    def __init__(self, name: str, mint, size: int, min_ttl: float = 15.0):
+        self.name = name
+        self.mint = mint
+        self.size = size
+        self.min_ttl = min_ttl
+        self._sessions: collections.deque = collections.deque()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stats = {"hits": 0, "misses": 0, "minted": 0, "expired": 0, "mint_errors": 0}
+
+    def _expires_at(self, session: dict) -> float:
+        return session.get("expires_at") or session["_minted_at"] + SESSION_DEFAULT_TTL
+
+    def _prune(self):
+        cutoff = time.time() + self.min_ttl
+        fresh = [s for s in self._sessions if self._expires_at(s) > cutoff]
+        self._stats["expired"] += len(self._sessions) - len(fresh)
+        self._sessions = collections.deque(fresh)
+
+    async def _mint(self) -> dict:
+        session = await self.mint()
+        session["_minted_at"] = time.time()
+        self._stats["minted"] += 1
+        return session
+
+    async def acquire(self) -> dict:
+        """A fresh session: pre-minted if one is ready, otherwise minted now"""
+        self._prune()
+        if self._sessions:
+            session = self._sessions.popleft()
+            self._stats["hits"] += 1
+        else:
+            self._stats["misses"] += 1
+            session = await self._mint()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return {k: v for k, v in session.items() if not k.startswith("_")}
+
+    async def _refill_forever(self):
+        backoff = 1.0
+        while True:
+            self._wakeup.clear()
+            self._prune()
+            missing = self.size - len(self._sessions)
+            if missing > 0:
+                results = await asyncio.gather(*(self._mint() for _ in range(missing)), return_exceptions=True)
+                failed = [r for r in results if isinstance(r, BaseException)]
+                self._sessions.extend(r for r in results if not isinstance(r, BaseException))
+                if failed:
+                    self._stats["mint_errors"] += len(failed)
+                    logger.warning("⚠️ %s pool: %d mint(s) failed, retrying in %.0fs: %s",
+                                   self.name, len(failed), backoff, failed[0])
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 60.0)
+                    continue
+                backoff = 1.0
+            # Sleep until a session is taken or the oldest one is about to go stale
+            if self._sessions:
+                timeout = max(1.0, min(self._expires_at(s) for s in self._sessions) - self.min_ttl - time.time())
+            else:
+                timeout = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self.size <= 0 or self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._refill_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._sessions.clear()
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        lookups = s["hits"] + s["misses"]
+        s["depth"] = len(self._sessions)
+        s["target"] = self.size
+        s["hit_rate"] = s["hits"] / lookups if lookups else 0.0
+        return s
+
+# /ws/realtime and /api/realtime/session (server-configured tools)
+ws_sessions = SessionPool("realtime_session", auth.create_ephemeral_session, SESSION_POOL_SIZE, SESSION_POOL_MIN_TTL)
+# /api/realtime/token (browser-side WebRTC)
+token_sessions = SessionPool("realtime_token", auth.create_webrtc_token, SESSION_POOL_SIZE, SESSION_POOL_MIN_TTL)
+
+def start():
+    ws_sessions.start()
+    token_sessions.start()
+
+async def stop():
+    await ws_sessions.stop()
+    await token_sessions.stop()
@@ -0,0 +1,346 @@
+"""
+Per-session state (verification flags and friends) with TTL expiry.
+
+Every /ws/realtime connection and every X-Session-Id caller gets its own
+entry. Two backends share one small interface: get / update / delete for
+session hashes, incr for rate-limit counters, push / pop for work queues
+(the shared audit queue):
+
+- MemoryStore: in-process, bounded, sliding TTL. Entries live in an
+  OrderedDict in last-touched order, so expiry and LRU eviction both pop from
+  the front in O(1). Counters have a fixed expiry and live in their own
+  OrderedDict in creation order, so a burst of them never evicts a session.
+- RedisStore: speaks the Redis protocol (hashes, INCR, lists, EXPIRE), so
+  state can be shared between uvicorn worker processes. Point it at a real Redis or at
+  the bundled stand-in: `python -m backend.state_server`.
+
+Selected with SESSION_STORE=memory|redis.
+"""
+import json
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlparse
+
+from . import logs
+from .config import SESSION_STORE, SESSION_STORE_URL, SESSION_TTL, SESSION_MAX_ENTRIES
+
+logger = logs.get_logger("session_store")
+
+class MemoryStore:
+    """Bounded in-process store; each write or read refreshes the entry's TTL"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 1800.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, fields)
+        self._counters: OrderedDict = OrderedDict()  # key -> (expires_at, n), in creation order
+        self._lists: dict[str, deque] = {}  # queues never expire or get evicted
+        self._lock = threading.Lock()
+        self._stats = {"reads": 0, "writes": 0, "expirations": 0, "evictions": 0, "counter_evictions": 0}
+
+    def _expire_front(self, now: float):
+        # Entries are kept in last-touched order, so expired ones sit at the front
+        while self._data:
+            key, (expires, _) = next(iter(self._data.items()))
+            if expires > now:
+                break
+            del self._data[key]
+            self._stats["expirations"] += 1
+
+    def _expire_counters(self, now: float):
+        # Counters are never refreshed, so with one window per key family creation order is expiry order
+        while self._counters:
+            key, (expires, _) = next(iter(self._counters.items()))
+            if expires > now:
+                break
+            del self._counters[key]
+
+    def _live(self, key: str, now: float) -> dict | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, fields = entry
+        if expires <= now:
+            del self._data[key]
+            self._stats["expirations"] += 1
+            return None
+        return fields
+
+    def get(self, key: str) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._stats["reads"] += 1
+            fields = self._live(key, now)
+            if fields is None:
+                return {}
+            self._data[key] = (now + self.ttl, fields)
+            self._data.move_to_end(key)
+            return dict(fields)
+
+    def update(self, key: str, fields: dict, ttl: float | None = None):
+        now = time.monotonic()
+        with self._lock:
+            self._stats["writes"] += 1
+            self._expire_front(now)
+            merged = self._live(key, now) or {}
+            merged.update(fields)
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), merged)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def expire(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            fields = self._live(key, now)
+            if fields is None:
+                return False
+            self._data[key] = (now + ttl, fields)
+            self._data.move_to_end(key)
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            deleted = self._data.pop(key, None) is not None
+            return self._counters.pop(key, None) is not None or deleted
+
+    def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter; a new counter expires `ttl` seconds after creation"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_counters(now)
+            entry = self._counters.get(key)
+            if entry is None or entry[0] <= now:
+                # A new window goes to the back, keeping the dict in expiry order
+                self._counters.pop(key, None)
+                entry = (now + ttl, 0)
+            expires, n = entry
+            # Reassigning an existing key keeps its position: counting never extends the window
+            self._counters[key] = (expires, n + 1)
+            while len(self._counters) > self.maxsize:
+                self._counters.popitem(last=False)
+                self._stats["counter_evictions"] += 1
+            return n + 1
+
+    def push(self, key: str, values: list[str], maxlen: int | None = None) -> int:
+        """Append to a queue, keeping at most `maxlen` newest items; returns the length before trimming"""
+        with self._lock:
+            q = self._lists.setdefault(key, deque())
+            q.extend(values)
+            length = len(q)
+            while maxlen is not None and len(q) > maxlen:
+                q.popleft()
+            return length
+
+    def pop(self, key: str, count: int) -> list[str]:
+        with self._lock:
+            q = self._lists.get(key)
+            if not q:
+                return []
+            return [q.popleft() for _ in range(min(count, len(q)))]
+
+    def length(self, key: str) -> int:
+        with self._lock:
+            return len(self._lists.get(key, ()))
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._expire_front(now)
+            self._expire_counters(now)
+            s = dict(self._stats)
+            s["size"] = len(self._data)
+            s["counters"] = len(self._counters)
+        s["backend"] = "memory"
+        s["maxsize"] = self.maxsize
+        s["ttl"] = self.ttl
+        return s
+
+class StoreError(Exception):
+    pass
+
+class RespConnection:
+    """Minimal blocking Redis protocol (RESP2) client: one socket, one command at a time"""
+
+    def __init__(self, host: str, port: int, db: int = 0, timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        if self.db:
+            self._roundtrip([("SELECT", self.db)])
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+    def _drop(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._file = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    def _read_reply(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return StoreError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self._file.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read_reply() for _ in range(n)]
+        raise StoreError(f"unexpected reply: {line!r}")
+
+    def _roundtrip(self, commands: list) -> list:
+        self._sock.sendall(b"".join(self._encode(c) for c in commands))
+        # Read every reply before raising so the connection stays in sync
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, StoreError):
+                raise reply
+        return replies
+
+    def pipeline(self, *commands) -> list:
+        """Send several commands in one write and return their replies; reconnects once on a dropped socket"""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(list(commands))
+                except (ConnectionError, socket.timeout, OSError):
+                    self._drop()
+                    if attempt == 2:
+                        raise
+
+    def execute(self, *args):
+        return self.pipeline(args)[0]
+
+class RedisStore:
+    """Session state in Redis hashes (one hash per session, values JSON-encoded)"""
+
+    def __init__(self, url: str, ttl: float = 1800.0, prefix: str = "session:"):
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self.conn = RespConnection(parsed.hostname or "127.0.0.1", parsed.port or 6379, db)
+        self._stats = {"reads": 0, "writes": 0, "errors": 0}
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def get(self, key: str) -> dict:
+        self._stats["reads"] += 1
+        try:
+            flat, _ = self.conn.pipeline(("HGETALL", self._key(key)), ("EXPIRE", self._key(key), int(self.ttl)))
+        except (OSError, StoreError):
+            self._stats["errors"] += 1
+            raise
+        return {flat[i].decode(): json.loads(flat[i + 1]) for i in range(0, len(flat or []), 2)}
+
+    def update(self, key: str, fields: dict, ttl: float | None = None):
+        self._stats["writes"] += 1
+        args = ["HSET", self._key(key)]
+        for field, value in fields.items():
+            args += [field, json.dumps(value)]
+        try:
+            self.conn.pipeline(args, ("EXPIRE", self._key(key), int(self.ttl if ttl is None else ttl)))
+        except (OSError, StoreError):
+            self._stats["errors"] += 1
+            raise
+
+    def expire(self, key: str, ttl: float) -> bool:
+        return bool(self.conn.execute("EXPIRE", self._key(key), int(ttl)))
+
+    def delete(self, key: str) -> bool:
+        return bool(self.conn.execute("DEL", self._key(key)))
+
+    def incr(self, key: str, ttl: float) -> int:
+        # SET NX only succeeds for a new counter, so the window starts at the first hit
+        _, n = self.conn.pipeline(("SET", key, 0, "EX", max(1, int(ttl)), "NX"), ("INCR", key))
+        return n
+
+    def push(self, key: str, values: list[str], maxlen: int | None = None) -> int:
+        commands = [("RPUSH", key, *values)]
+        if maxlen is not None:
+            commands.append(("LTRIM", key, -maxlen, -1))
+        return self.conn.pipeline(*commands)[0]
+
+    def pop(self, key: str, count: int) -> list[str]:
+        items = self.conn.execute("LPOP", key, count)
+        return [i.decode() for i in items or []]
+
+    def length(self, key: str) -> int:
+        return self.conn.execute("LLEN", key)
+
+    def close(self):
+        self.conn.close()
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        s["backend"] = "redis"
+        s["url"] = self.url
+        s["ttl"] = self.ttl
+        return s
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_STORE == "redis":
+                    _store = RedisStore(SESSION_STORE_URL, SESSION_TTL)
+                else:
+                    _store = MemoryStore(SESSION_MAX_ENTRIES, SESSION_TTL)
+                logger.info("🗂️ Session store: %s", SESSION_STORE)
+    return _store
+
+def close_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,279 @@
+"""
+Local stand-in for Redis, for development and single-box multi-process runs.
+
+Implements the subset of the Redis protocol the backend uses (hashes,
+counters, lists, key expiry) on top of an asyncio server, with an LRU bound on the number of keys.
+Any real Redis can replace it without code changes.
+
+    python -m backend.state_server --port 6390
+    SESSION_STORE=redis SESSION_STORE_URL=redis://127.0.0.1:6390/0 ...
+"""
+import argparse
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from . import logs
+
+logger = logs.get_logger("state_server")
+
+class WrongType(Exception):
+    pass
+
+class Keyspace:
+    """Key -> value with optional expiry, kept in last-touched order for O(1) LRU eviction"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._data: OrderedDict = OrderedDict()  # key -> [expires_at | None, value]
+        self.evictions = 0
+
+    def lookup(self, key: bytes):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def value(self, key: bytes, kind: type):
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        if not isinstance(entry[1], kind):
+            raise WrongType()
+        return entry[1]
+
+    def create(self, key: bytes, value):
+        self._data[key] = [None, value]
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+            self.evictions += 1
+        return self._data[key]
+
+    def delete(self, key: bytes) -> bool:
+        return self.lookup(key) is not None and self._data.pop(key, None) is not None
+
+    def __len__(self):
+        return len(self._data)
+
+class StateServer:
+    def __init__(self, max_keys: int = 100000):
+        self.keys = Keyspace(max_keys)
+        self.commands = {
+            b"PING": self.ping,
+            b"SELECT": self.select,
+            b"HSET": self.hset,
+            b"HGET": self.hget,
+            b"HGETALL": self.hgetall,
+            b"HDEL": self.hdel,
+            b"EXPIRE": self.expire,
+            b"TTL": self.ttl,
+            b"DEL": self.delete,
+            b"EXISTS": self.exists,
+            b"DBSIZE": self.dbsize,
+            b"GET": self.get,
+            b"SET": self.set,
+            b"INCR": self.incr,
+            b"RPUSH": self.rpush,
+            b"LPOP": self.lpop,
+            b"LTRIM": self.ltrim,
+            b"LLEN": self.llen,
+        }
+
+    # --- commands ---
+    def ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def select(self, db):
+        return "OK"
+
+    def hset(self, key, *pairs):
+        h = self.keys.value(key, dict)
+        if h is None:
+            h = self.keys.create(key, {})[1]
+        added = 0
+        for i in range(0, len(pairs) - 1, 2):
+            added += pairs[i] not in h
+            h[pairs[i]] = pairs[i + 1]
+        return added
+
+    def hget(self, key, field):
+        h = self.keys.value(key, dict)
+        return None if h is None else h.get(field)
+
+    def hgetall(self, key):
+        h = self.keys.value(key, dict) or {}
+        return [item for pair in h.items() for item in pair]
+
+    def hdel(self, key, *fields):
+        h = self.keys.value(key, dict)
+        if h is None:
+            return 0
+        removed = sum(h.pop(f, None) is not None for f in fields)
+        if not h:
+            self.keys.delete(key)
+        return removed
+
+    def expire(self, key, seconds):
+        entry = self.keys.lookup(key)
+        if entry is None:
+            return 0
+        entry[0] = time.monotonic() + int(seconds)
+        return 1
+
+    def ttl(self, key):
+        entry = self.keys.lookup(key)
+        if entry is None:
+            return -2
+        return -1 if entry[0] is None else max(0, round(entry[0] - time.monotonic()))
+
+    def delete(self, *keys):
+        return sum(self.keys.delete(k) for k in keys)
+
+    def exists(self, *keys):
+        return sum(self.keys.lookup(k) is not None for k in keys)
+
+    def dbsize(self):
+        return len(self.keys)
+
+    def get(self, key):
+        value = self.keys.value(key, (bytes, int))
+        return None if value is None else str(value).encode() if isinstance(value, int) else value
+
+    def set(self, key, value, *options):
+        opts = [o.upper() for o in options]
+        if b"NX" in opts and self.keys.lookup(key) is not None:
+            return None
+        entry = self.keys.create(key, value)
+        if b"EX" in opts:
+            entry[0] = time.monotonic() + int(opts[opts.index(b"EX") + 1])
+        return "OK"
+
+    def incr(self, key):
+        entry = self.keys.lookup(key)
+        if entry is None:
+            entry = self.keys.create(key, 0)
+        if not isinstance(entry[1], int):
+            try:
+                entry[1] = int(entry[1])
+            except (TypeError, ValueError):
+                raise WrongType()
+        entry[1] += 1
+        return entry[1]
+
+    def rpush(self, key, *values):
+        items = self.keys.value(key, deque)
+        if items is None:
+            items = self.keys.create(key, deque())[1]
+        items.extend(values)
+        return len(items)
+
+    def lpop(self, key, count=None):
+        items = self.keys.value(key, deque)
+        if not items:
+            return None
+        if count is None:
+            popped = items.popleft()
+        else:
+            popped = [items.popleft() for _ in range(min(int(count), len(items)))]
+        if not items:
+            self.keys.delete(key)
+        return popped
+
+    def ltrim(self, key, start, stop):
+        items = self.keys.value(key, deque)
+        if items is None:
+            return "OK"
+        kept = list(items)[int(start):len(items) + 1 + int(stop) if int(stop) < 0 else int(stop) + 1]
+        items.clear()
+        items.extend(kept)
+        if not items:
+            self.keys.delete(key)
+        return "OK"
+
+    def llen(self, key):
+        items = self.keys.value(key, deque)
+        return 0 if items is None else len(items)
+
+    # --- protocol ---
+    @staticmethod
+    def encode(reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, bool):
+            reply = int(reply)
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return b"+" + reply.encode() + b"\r\n"
+        if isinstance(reply, Exception):
+            return b"-" + str(reply).encode() + b"\r\n"
+        if isinstance(reply, (list, tuple)):
+            return b"*%d\r\n" % len(reply) + b"".join(StateServer.encode(r) for r in reply)
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    @staticmethod
+    async def read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command (e.g. from telnet / redis-cli)
+        args = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    def dispatch(self, args: list[bytes]):
+        handler = self.commands.get(args[0].upper())
+        if handler is None:
+            return Exception(f"ERR unknown command '{args[0].decode(errors='replace')}'")
+        try:
+            return handler(*args[1:])
+        except WrongType:
+            return Exception("WRONGTYPE Operation against a key holding the wrong kind of value")
+        except (TypeError, ValueError) as e:
+            return Exception(f"ERR {e}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await self.read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                writer.write(self.encode(self.dispatch(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info("🗄️ State server listening on %s:%d", host, port)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis-protocol session state server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--max-keys", type=int, default=100000)
+    args = parser.parse_args()
+    logs.configure()
+    try:
+        asyncio.run(StateServer(args.max_keys).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logs.shutdown()
+
+if __name__ == "__main__":
+    main()
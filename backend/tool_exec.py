@@ -0,0 +1,111 @@
+"""
+Concurrent execution of the tool calls in one model response.
+
+A response can carry several function calls. Each call starts as soon as its
+arguments are complete, independent calls run concurrently, and the proxy
+sends every output followed by a single `response.create` once the response
+is done, instead of one model turn per call.
+
+Calls to state-changing tools (registered with stateful=True, such as
+verify_customer) act as barriers: calls that
+come after one in the response wait for it, so "verify, then fetch policies"
+in a single response still sees the verification.
+
+The same call is announced twice, by response.function_call_arguments.done
+and again in response.done's output. Each connection keeps a bounded set of
+call_ids it has already started, so every call executes exactly once.
+"""
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+
+from . import logs
+
+logger = logs.get_logger("tool_exec")
+
+_lock = threading.Lock()
+_stats = {"calls": 0, "duplicates_suppressed": 0, "batches": 0, "failures": 0}
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        _stats[key] += n
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+class SeenCalls:
+    """Bounded set of call_ids; the oldest are forgotten first, O(1) add/lookup"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._ids: OrderedDict = OrderedDict()
+
+    def add(self, call_id: str) -> bool:
+        """Record a call_id; False if it was already seen"""
+        if call_id in self._ids:
+            return False
+        self._ids[call_id] = None
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+        return True
+
+    def __contains__(self, call_id: str) -> bool:
+        return call_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+class ToolBatch:
+    def __init__(self, execute, seen: SeenCalls | None = None, stateful: frozenset = frozenset()):
+        """`execute(name, args)` runs one tool and returns its output (a dict or serialized JSON).
+        Pass the connection's SeenCalls so duplicates are dropped across batches."""
+        self.execute = execute
+        self.seen = seen if seen is not None else SeenCalls()
+        self.stateful = stateful
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._barrier: asyncio.Task | None = None
+
+    def __contains__(self, call_id: str) -> bool:
+        return call_id in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def _run(self, name: str, arguments: str, after: asyncio.Task | None) -> dict:
+        if after is not None:
+            await asyncio.wait([after])
+        try:
+            args = json.loads(arguments or "{}")
+        except ValueError:
+            return {"error": "invalid_arguments", "message": "Tool arguments were not valid JSON"}
+        try:
+            return await self.execute(name, args)
+        except Exception as e:
+            _count("failures")
+            logger.error("❌ Tool %s failed: %s", name, e)
+            return {"error": "tool_failed", "message": f"{name} failed, please try again"}
+
+    def start(self, call_id: str, name: str, arguments: str) -> bool:
+        """Schedule a call; returns False (and runs nothing) for a call_id already seen on this connection"""
+        if call_id in self._tasks or not self.seen.add(call_id):
+            _count("duplicates_suppressed")
+            logger.debug("🔁 Suppressed duplicate tool call %s (%s)", call_id, name)
+            return False
+        _count("calls")
+        task = asyncio.create_task(self._run(name, arguments, self._barrier))
+        if name in self.stateful:
+            self._barrier = task
+        self._tasks[call_id] = task
+        return True
+
+    async def results(self) -> list[tuple[str, dict]]:
+        """Wait for every call; (call_id, output) pairs in the order the calls were started"""
+        outputs = await asyncio.gather(*self._tasks.values())
+        _count("batches")
+        return list(zip(self._tasks.keys(), outputs))
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
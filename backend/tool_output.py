@@ -0,0 +1,72 @@
+"""
+Shaping of tool outputs before they go back to the model.
+
+Everything in a function_call_output is input the model must read before it
+starts speaking, so outputs are cut down to what the agent can use:
+
+- projection: each tool declares which fields it returns (nested lists of
+  rows are projected per row), everything else is dropped
+- size cap: long lists lose trailing rows and long strings are cut, with
+  markers saying what was left out
+- compact JSON (no whitespace), with a token estimate for logging/stats
+"""
+import json
+
+TRUNCATION_MARK = "…[truncated]"
+
+def dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON with BPE tokenizers; close enough to track trends
+    return (len(text) + 3) // 4
+
+def _project_value(value, keys):
+    if isinstance(value, dict):
+        return {k: value[k] for k in keys if k in value}
+    if isinstance(value, list):
+        return [_project_value(v, keys) for v in value]
+    return value
+
+def project(output: dict, fields: dict | None) -> dict:
+    """Keep only `fields` (name -> None, or name -> list of sub-keys for dict/list-of-dict values).
+    Error outputs pass through untouched."""
+    if not fields or not isinstance(output, dict) or "error" in output:
+        return output
+    return {name: output[name] if keys is None else _project_value(output[name], keys)
+            for name, keys in fields.items() if name in output}
+
+def cap(output: dict, max_chars: int) -> tuple[dict, bool]:
+    """Shrink `output` until its compact JSON fits in `max_chars`. Returns (output, truncated)."""
+    if max_chars <= 0 or len(dumps(output)) <= max_chars:
+        return output, False
+    output = dict(output)
+    omitted: dict[str, int] = {}
+    # Shrink the largest field first: drop trailing rows of a list, or cut a string to fit
+    while (overflow := len(dumps(output)) - max_chars) > 0:
+        candidates = [k for k, v in output.items()
+                      if (isinstance(v, list) and len(v) > 1) or (isinstance(v, str) and len(v) > len(TRUNCATION_MARK))]
+        if not candidates:
+            break
+        key = max(candidates, key=lambda k: len(dumps(output[k])))
+        value = output[key]
+        if isinstance(value, list):
+            output[key] = value[:-1]
+            omitted[key] = omitted.get(key, 0) + 1
+            output["_omitted"] = omitted
+        else:
+            keep = max(0, len(value) - overflow - len(TRUNCATION_MARK))
+            output[key] = value[:keep] + TRUNCATION_MARK
+    return output, True
+
+def render(output: dict, fields: dict | None = None, max_chars: int = 0) -> tuple[str, dict]:
+    """Project, cap and serialize. Returns (text, info) where info has chars/tokens before and after."""
+    raw_chars = len(dumps(output))
+    shaped, truncated = cap(project(output, fields), max_chars)
+    text = dumps(shaped)
+    return text, {
+        "raw_chars": raw_chars,
+        "chars": len(text),
+        "tokens": estimate_tokens(text),
+        "truncated": truncated,
+    }
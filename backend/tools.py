@@ -0,0 +1,325 @@
+"""
+Tool registry for the Realtime proxy.
+
+Each tool is declared once, with its description, JSON-schema parameters,
+timeout and async handler. The registry dispatches calls by name, validates
+arguments against the schema, enforces the timeout, records per-tool latency
+histograms, and generates the `tools` array that session profiles send in
+session.update and in the ephemeral session body.
+
+Handlers take a ToolContext (the connection's state) and the validated
+arguments as keyword arguments, and return the dict sent back as the
+function_call_output.
+
+A successful verify_customer speculatively loads the customer's policies:
+the follow-up get_customer_policies call is served from the connection's
+prefetch, and with PREFETCH_POLICY_SUMMARY a compact summary rides along in
+the verification output so the agent can answer in the same turn.
+
+Outputs are shaped before they are sent (see tool_output): each tool
+declares the fields the agent needs, and `call` returns the projected,
+size-capped compact JSON and records its estimated token count.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+
+from . import async_db, auth, logs, metrics, migrations, rate_limit, tool_output
+from .config import (
+    TOOL_TIMEOUT, TOOL_OUTPUT_MAX_CHARS, TOPIC_MATCH_THRESHOLD, VERIFY_RATE_LIMIT, VERIFY_RATE_WINDOW,
+    PREFETCH_POLICIES, PREFETCH_POLICY_SUMMARY, PREFETCH_SUMMARY_WAIT, PREFETCH_TTL,
+)
+
+logger = logs.get_logger("tools")
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+# Fields of a policy worth saying out loud; the summary injected after verification
+SUMMARY_FIELDS = ("policy_number", "coverage_type", "premium", "next_due_date", "status")
+
+_prefetch_stats = {"started": 0, "hits": 0, "misses": 0, "expired": 0}
+
+@dataclass
+class ToolContext:
+    # Session store key holding this caller's verification state
+    state_id: str
+    # normalized email -> (loaded_at, task loading that customer's policies)
+    prefetched: dict = field(default_factory=dict)
+
+    def prefetch_policies(self, email: str) -> asyncio.Task:
+        key = migrations.normalize_email(email)
+        if key in self.prefetched:
+            _discard(self.prefetched[key][1])
+        self.prefetched[key] = (time.monotonic(), asyncio.create_task(async_db.get_customer_policies(email)))
+        _prefetch_stats["started"] += 1
+        return self.prefetched[key][1]
+
+    def take_prefetched(self, email: str) -> asyncio.Task | None:
+        """The prefetch for `email` if it is still fresh (used once)"""
+        entry = self.prefetched.pop(migrations.normalize_email(email), None)
+        if entry is None:
+            _prefetch_stats["misses"] += 1
+            return None
+        loaded_at, task = entry
+        if time.monotonic() - loaded_at > PREFETCH_TTL:
+            _discard(task)
+            _prefetch_stats["expired"] += 1
+            return None
+        _prefetch_stats["hits"] += 1
+        return task
+
+    def close(self):
+        """Cancel prefetches nobody used; called when the connection ends"""
+        for _, task in self.prefetched.values():
+            _discard(task)
+        self.prefetched.clear()
+
+def _discard(task: asyncio.Task):
+    """Cancel an unused prefetch, or retrieve its failure so it isn't logged as never retrieved"""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+@dataclass
+class Tool:
+    name: str
+    description: str
+    parameters: dict
+    handler: object
+    timeout: float
+    # Later calls in the same model response wait for this one (it changes session state)
+    stateful: bool = False
+    # Top-level output keys sent to the model (a list value projects nested rows); None sends everything
+    output_fields: dict | None = None
+    max_chars: int = TOOL_OUTPUT_MAX_CHARS
+    latency: metrics.Histogram = field(default_factory=metrics.Histogram)
+    output_tokens: metrics.Histogram = field(default_factory=lambda: metrics.Histogram(metrics.TOKEN_BUCKETS))
+    counts: dict = field(default_factory=lambda: {"calls": 0, "errors": 0, "timeouts": 0, "invalid": 0, "truncated": 0})
+
+    def schema(self) -> dict:
+        return {"type": "function", "name": self.name, "description": self.description, "parameters": self.parameters}
+
+def validate(parameters: dict, args) -> tuple[dict, str | None]:
+    """Check `args` against an object schema. Returns (clean_args, error); unknown keys are dropped."""
+    if not isinstance(args, dict):
+        return {}, "arguments must be a JSON object"
+    properties = parameters.get("properties", {})
+    clean = {}
+    for name, spec in properties.items():
+        if name not in args or args[name] is None:
+            continue
+        value = args[name]
+        expected = spec.get("type")
+        # Models sometimes send digits as numbers (last4: 1234); accept them for string fields
+        if expected == "string" and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if expected in _JSON_TYPES and (not isinstance(value, _JSON_TYPES[expected])
+                                        or (expected in ("integer", "number") and isinstance(value, bool))):
+            return {}, f"'{name}' must be of type {expected}"
+        if "enum" in spec and value not in spec["enum"]:
+            return {}, f"'{name}' must be one of {spec['enum']}"
+        clean[name] = value
+    missing = [r for r in parameters.get("required", []) if r not in clean or clean[r] == ""]
+    if missing:
+        return {}, f"missing required argument(s): {', '.join(missing)}"
+    return clean, None
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools: dict[str, Tool] = {}
+        self._lock = threading.Lock()
+        self._unknown = 0
+
+    def tool(self, description: str, parameters: dict, timeout: float | None = None, stateful: bool = False,
+             output_fields: dict | None = None, max_chars: int | None = None):
+        """Decorator registering an async handler under its function name"""
+        def register(handler):
+            self._tools[handler.__name__] = Tool(
+                name=handler.__name__,
+                description=description,
+                parameters=parameters,
+                handler=handler,
+                timeout=TOOL_TIMEOUT if timeout is None else timeout,
+                stateful=stateful,
+                output_fields=output_fields,
+                max_chars=TOOL_OUTPUT_MAX_CHARS if max_chars is None else max_chars,
+            )
+            return handler
+        return register
+
+    def get(self, name: str) -> Tool:
+        return self._tools[name]
+
+    def names(self) -> list[str]:
+        return list(self._tools)
+
+    def stateful_names(self) -> frozenset:
+        return frozenset(t.name for t in self._tools.values() if t.stateful)
+
+    def schemas(self, names: list[str] | None = None) -> list[dict]:
+        """`tools` array for session.update / the ephemeral session body (KeyError for unknown names)"""
+        return [self._tools[n].schema() for n in (self.names() if names is None else names)]
+
+    def _count(self, tool: Tool, key: str):
+        with self._lock:
+            tool.counts[key] += 1
+
+    async def execute(self, ctx: ToolContext, name: str, args) -> dict:
+        tool = self._tools.get(name)
+        if tool is None:
+            with self._lock:
+                self._unknown += 1
+            logger.warning("⚠️ Unknown tool: %s", name)
+            return {"error": "unknown_tool", "message": f"Unknown tool: {name}"}
+
+        clean, error = validate(tool.parameters, args)
+        if error:
+            self._count(tool, "invalid")
+            logger.warning("⚠️ Invalid arguments for %s: %s", name, error)
+            return {"error": "invalid_arguments", "message": error}
+
+        logger.info("🔧 Handling tool call: %s with args: %s", name, logs.redact(clean))
+        self._count(tool, "calls")
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(tool.handler(ctx, **clean), tool.timeout)
+        except asyncio.TimeoutError:
+            self._count(tool, "timeouts")
+            logger.error("⏱️ Tool %s timed out after %.1fs", name, tool.timeout)
+            return {"error": "timeout", "message": f"{name} took too long, please try again"}
+        except Exception as e:
+            self._count(tool, "errors")
+            logger.error("❌ Tool %s failed: %s", name, e)
+            return {"error": "tool_failed", "message": f"{name} failed, please try again"}
+        finally:
+            tool.latency.observe((time.perf_counter() - start) * 1000)
+
+    async def call(self, ctx: ToolContext, name: str, args) -> str:
+        """Execute and shape: the compact JSON string sent as the function_call_output"""
+        output = await self.execute(ctx, name, args)
+        tool = self._tools.get(name)
+        if tool is None:
+            return tool_output.dumps(output)
+        text, info = tool_output.render(output, tool.output_fields, tool.max_chars)
+        tool.output_tokens.observe(info["tokens"])
+        if info["truncated"]:
+            self._count(tool, "truncated")
+        logger.info("📦 %s output: %d chars ≈ %d tokens (raw %d chars%s)", name, info["chars"], info["tokens"],
+                    info["raw_chars"], ", truncated" if info["truncated"] else "")
+        return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = {"unknown_tool_calls": self._unknown, "prefetch": dict(_prefetch_stats), "tools": {}}
+            for tool in self._tools.values():
+                s["tools"][tool.name] = {**tool.counts, "timeout": tool.timeout, "max_chars": tool.max_chars}
+        for tool in self._tools.values():
+            s["tools"][tool.name]["latency_ms"] = tool.latency.snapshot()
+            s["tools"][tool.name]["output_tokens"] = tool.output_tokens.snapshot()
+        return s
+
+registry = ToolRegistry()
+
+@registry.tool(
+    description="Verify customer identity using email, full name, and last 4 digits of phone. Call this immediately after collecting all three pieces of information from the customer.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "email": {"type": "string"},
+            "full_name": {"type": "string"},
+            "last4": {"type": "string"},
+            "order_id": {"type": "string"}
+        },
+        "required": ["email"]
+    },
+    stateful=True,
+)
+async def verify_customer(ctx: ToolContext, email: str, full_name: str = "", last4: str = "", order_id: str = ""):
+    # Attempts per email are rate limited across workers
+    if await async_db.run(rate_limit.hit, "verify", email, VERIFY_RATE_LIMIT, VERIFY_RATE_WINDOW):
+        result = await async_db.verify_customer(email, full_name, last4, order_id)
+        output = {"verified": result}
+    else:
+        result = False
+        output = {"verified": False, "error": "too_many_attempts", "message": "Too many verification attempts for this email, try again later"}
+    # Recorded before the prefetch: a slow or failing prefetch must not undo a genuine verification
+    await async_db.run(auth.set_verified, ctx.state_id, result)
+    logger.info("✅ Customer verification result: %s", result)
+    if result and PREFETCH_POLICIES:
+        # The model almost always asks for the policies next; start loading them now
+        prefetch = ctx.prefetch_policies(email)
+        if PREFETCH_POLICY_SUMMARY:
+            # Best effort: wait briefly (without cancelling the prefetch) and leave the summary out otherwise
+            await asyncio.wait({prefetch}, timeout=PREFETCH_SUMMARY_WAIT)
+            if not prefetch.done():
+                logger.info("⏳ Policy prefetch still running, verifying without a summary")
+            elif prefetch.exception() is not None:
+                logger.warning("⚠️ Policy prefetch failed, verifying without a summary: %s", prefetch.exception())
+            else:
+                policies = prefetch.result()
+                output["policy_count"] = len(policies)
+                output["policies_summary"] = [{k: p.get(k) for k in SUMMARY_FIELDS} for p in policies]
+    return output
+
+@registry.tool(
+    description="Retrieve all P&C insurance policies (auto, home, commercial, umbrella) for a verified customer. Only call this AFTER the customer has been successfully verified. Returns policy details including premiums, coverage amounts, and due dates.",
+    parameters={
+        "type": "object",
+        "properties": {"email": {"type": "string"}},
+        "required": ["email"]
+    },
+    output_fields={
+        "policies": ["policy_number", "coverage_type", "premium", "next_due_date", "payment_method", "status"],
+        "count": None,
+    },
+)
+async def get_customer_policies(ctx: ToolContext, email: str):
+    if not await async_db.run(auth.is_verified, ctx.state_id):
+        return {"error": "verification_required", "message": "Customer must be verified to access P&C policy details"}
+    policies = None
+    prefetch = ctx.take_prefetched(email)
+    if prefetch is not None and not prefetch.cancelled():
+        try:
+            policies = await prefetch
+        except Exception as e:
+            logger.warning("⚠️ Policy prefetch failed, reading again: %s", e)
+    if policies is None:
+        policies = await async_db.get_customer_policies(email)
+    return {"policies": policies, "count": len(policies)}
+
+@registry.tool(
+    description="Get general P&C insurance coverage information by type. Use this for explaining coverage types, terms, and general questions. No verification required. Common types: auto, homeowners, commercial, liability, claims, cancellation, premiums - or pass the caller's own words (e.g. 'car insurance', 'HO-3').",
+    parameters={
+        "type": "object",
+        "properties": {
+            "coverage_type": {"type": "string", "description": "Coverage type or a short free-form description of it"}
+        },
+        "required": ["coverage_type"]
+    },
+    output_fields={"topic": None, "section": None, "text": None, "confidence": None},
+)
+async def get_pc_coverage_info(ctx: ToolContext, coverage_type: str):
+    # Resolve free-form coverage phrases to a policy topic in one shot
+    candidates = await async_db.resolve_topic(coverage_type)
+    topic, confidence = candidates[0] if candidates else (None, 0.0)
+    policy = None
+    if topic and confidence >= TOPIC_MATCH_THRESHOLD:
+        policy = await async_db.get_policy(topic)
+
+    if not policy:
+        return {"error": "Coverage information not found", "suggestions": [t for t, _ in candidates]}
+
+    # Check if verification is required for internal/restricted content
+    if policy["classification"] in ("internal", "restricted") and not await async_db.run(auth.is_verified, ctx.state_id):
+        return {"error": "verification_required", "message": "Verification required for detailed coverage information"}
+
+    return {**policy, "confidence": confidence}
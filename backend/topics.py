@@ -0,0 +1,127 @@
+"""
+Resolve free-form coverage questions ("car insurance", "HO-3", "cancel my
+policy") to a policy topic in one shot, so the model doesn't have to guess the
+exact topic string and retry on "not found".
+
+The index is built once from the policies table: topic and section tokens,
+character trigrams of the topic, and a synonym table. db.resolve_topic()
+rebuilds it whenever policies are re-seeded.
+"""
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Coverage types exposed by the get_pc_coverage_info tool and /api/pc-coverage
+COVERAGE_TYPES = {
+    "auto": "auto_coverage_limits",
+    "homeowners": "homeowners_coverage",
+    "commercial": "commercial_liability",
+    "liability": "commercial_liability",
+    "claims": "claims_process",
+}
+
+# Caller vocabulary -> topic. Only topics present in the index are used.
+SYNONYMS = {
+    **COVERAGE_TYPES,
+    "car": "auto_coverage_limits",
+    "vehicle": "auto_coverage_limits",
+    "collision": "auto_coverage_limits",
+    "comprehensive": "auto_coverage_limits",
+    "motorist": "auto_coverage_limits",
+    "home": "homeowners_coverage",
+    "house": "homeowners_coverage",
+    "dwelling": "homeowners_coverage",
+    "ho3": "homeowners_coverage",
+    "property": "homeowners_coverage",
+    "business": "commercial_liability",
+    "general liability": "commercial_liability",
+    "claim": "claims_process",
+    "accident": "claims_process",
+    "adjuster": "claims_process",
+    "cancel": "policy_cancellation",
+    "cancellation": "policy_cancellation",
+    "refund": "policy_cancellation",
+    "reinstatement": "policy_cancellation",
+    "premium": "premium_calculation",
+    "premiums": "premium_calculation",
+    "price": "premium_calculation",
+    "rate": "premium_calculation",
+    "cost": "premium_calculation",
+    "underwriting": "premium_calculation",
+}
+
+# Words that carry no signal about which topic is meant
+_STOPWORDS = {"the", "a", "an", "my", "of", "for", "and", "or", "to", "in", "on",
+              "what", "is", "are", "about", "info", "information", "insurance",
+              "policy", "policies", "coverage", "cover", "covered"}
+
+def tokenize(text: str) -> list[str]:
+    text = text.lower().replace("ho-3", "ho3")
+    return [t for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+
+def trigrams(text: str) -> set[str]:
+    s = f"  {re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _token_overlap(query_tokens: set, topic_tokens: set) -> float:
+    """Share of query tokens found in the topic, allowing prefix matches
+    ("homeowner" ~ "homeowners") for tokens of 4+ characters."""
+    if not query_tokens:
+        return 0.0
+    matched = 0
+    for q in query_tokens:
+        for t in topic_tokens:
+            if q == t or (min(len(q), len(t)) >= 4 and (t.startswith(q) or q.startswith(t))):
+                matched += 1
+                break
+    return matched / len(query_tokens)
+
+class TopicResolver:
+    def __init__(self, policies: list[dict]):
+        self.topics = {p["topic"] for p in policies}
+        self._entries = []
+        for p in policies:
+            tokens = set(tokenize(p["topic"])) | set(tokenize(p.get("section", "")))
+            self._entries.append((p["topic"], tokens, trigrams(p["topic"])))
+        self._synonyms = {k: v for k, v in SYNONYMS.items() if v in self.topics}
+
+    def candidates(self, query: str, limit: int = 3) -> list[tuple[str, float]]:
+        """Best-matching topics for `query`, as (topic, confidence) pairs"""
+        key = query.strip().lower()
+        if not key:
+            return []
+        if key in self.topics:
+            return [(key, 1.0)]
+        if key in self._synonyms:
+            return [(self._synonyms[key], 0.95)]
+
+        tokens = tokenize(key)
+        votes: dict[str, int] = {}
+        for i, t in enumerate(tokens):
+            pair = f"{t} {tokens[i + 1]}" if i + 1 < len(tokens) else None
+            for k in (pair, t):
+                if k and k in self._synonyms:
+                    votes[self._synonyms[k]] = votes.get(self._synonyms[k], 0) + 1
+        query_tokens = set(tokens)
+        query_grams = trigrams(" ".join(tokens) or key)
+
+        total_votes = sum(votes.values())
+        scored = []
+        for topic, topic_tokens, topic_grams in self._entries:
+            token_score = _token_overlap(query_tokens, topic_tokens)
+            gram_score = _jaccard(query_grams, topic_grams)
+            synonym_score = votes.get(topic, 0) / total_votes if total_votes else 0.0
+            score = max(synonym_score * 0.9, 0.6 * token_score + 0.4 * gram_score)
+            if score > 0:
+                scored.append((topic, round(min(score, 0.99), 3)))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:limit]
+
+    def resolve(self, query: str) -> tuple[str | None, float]:
+        best = self.candidates(query, 1)
+        return best[0] if best else (None, 0.0)
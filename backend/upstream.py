@@ -0,0 +1,363 @@
+"""
+Resilient upstream connection for the Realtime proxy.
+
+Upstream wraps the WebSocket to OpenAI for one /ws/realtime connection. If
+it drops abnormally mid-call, the proxy keeps the browser connected and
+reconnects with backoff using a pre-minted session from session_pool. It then
+replays:
+
+- the profile's session.update
+- a compact summary of the conversation so far (recent transcripts and tool
+  results) as a system message, so the agent neither greets nor re-verifies
+- the caller's audio appended during the gap (up to UPSTREAM_BUFFER_MS)
+
+Other events held during the gap belong to the old conversation and are not
+replayed. If the agent owed the caller a reply, one response.create is sent
+REPLY_GRACE_SECONDS after the resume, unless the new session started a turn
+by itself (server VAD answering the replayed audio); requests made meanwhile,
+such as the flush of interrupted tool calls, are folded into that one.
+Results of tool calls announced on the old connection are sent to the new
+session as system messages, since their call_ids mean nothing there.
+Verification state lives in the session store under the proxy's own
+session id, so tools keep working after a reconnect.
+"""
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import websockets
+
+from . import events, logs, metrics, session_pool
+from .config import (
+    REALTIME_MODEL, REALTIME_WS_URL, UPSTREAM_RECONNECT_ATTEMPTS, UPSTREAM_RECONNECT_BACKOFF,
+    UPSTREAM_RECONNECT_MAX, UPSTREAM_STABLE_SECONDS, UPSTREAM_BUFFER_MS, UPSTREAM_SUMMARY_TURNS,
+)
+
+logger = logs.get_logger("upstream")
+
+# PCM16 mono at 24kHz
+BYTES_PER_MS = 48
+SUMMARY_LINE_CHARS = 300
+MAX_BACKOFF_SECONDS = 4.0
+# After a reconnect, how long the new session gets to start a turn of its own (server VAD
+# answering the replayed audio) before the proxy asks for the reply it owes the caller
+REPLY_GRACE_SECONDS = 0.5
+
+_lock = threading.Lock()
+_stats = {"reconnects": 0, "reconnect_failures": 0, "audio_buffered": 0, "audio_dropped": 0, "events_discarded": 0}
+_gap_ms = metrics.Histogram()
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        _stats[key] += n
+
+class UpstreamClosed(ConnectionError):
+    pass
+
+class ConversationLog:
+    """Recent caller/agent transcripts and tool results, enough to brief a fresh session"""
+
+    def __init__(self, turns: int = UPSTREAM_SUMMARY_TURNS):
+        self.lines: deque = deque(maxlen=turns)
+        self.calls: dict[str, str] = {}  # call_id -> "name(args)"
+
+    def add(self, line: str):
+        line = " ".join(line.split())
+        if line:
+            self.lines.append(line if len(line) <= SUMMARY_LINE_CHARS else line[:SUMMARY_LINE_CHARS] + "…")
+
+    def summary(self) -> str | None:
+        if not self.lines:
+            return None
+        return ("The connection was briefly interrupted; this is the conversation so far. Continue from here: "
+                "do not greet the caller again and do not repeat identity verification that already succeeded.\n"
+                + "\n".join(self.lines))
+
+class Upstream:
+    def __init__(self, session_update: str, timeline=None, on_resume=None):
+        self.session_update = session_update
+        self.timeline = timeline
+        # Coroutine function run after a reconnect (the proxy flushes pending tool calls)
+        self.on_resume = on_resume
+        self.log = ConversationLog()
+        self._stale_calls: set = set()  # call_ids announced on a previous connection
+        self._ws = None
+        self._connected = asyncio.Event()
+        self._closed = False
+        self._failed: Exception | None = None
+        self._reconnects = 0  # over the whole caller connection
+        self._drops = 0  # consecutive drops without UPSTREAM_STABLE_SECONDS of uptime in between
+        self._up_since = 0.0
+        self._gap: deque = deque()  # (seq, message, is_audio, replay) sent while reconnecting
+        self._gap_seq = itertools.count()
+        self._gap_audio_bytes = 0
+        self._reply_owed = False  # a response was cut off or requested across the gap
+        self._responding = False
+        self._requested = False
+        # Set by response.created / speech_started; cleared on a drop, so it tells whether
+        # the new session started a turn by itself
+        self._new_turn = asyncio.Event()
+        self._settle: asyncio.Task | None = None  # owns response.create right after a reconnect
+        self._reply_due = False
+
+    async def _open(self):
+        session = await session_pool.ws_sessions.acquire()
+        if self.timeline is not None:
+            self.timeline.mark("minted")
+        headers = [("Authorization", f"Bearer {session['client_secret']}"), ("OpenAI-Beta", "realtime=v1")]
+        ws = await websockets.connect(f"{REALTIME_WS_URL}?model={REALTIME_MODEL}", additional_headers=headers)
+        if self.timeline is not None:
+            self.timeline.mark("upstream_connected")
+        # Pre-serialized session.update for the selected profile
+        await ws.send(self.session_update)
+        if self.timeline is not None:
+            self.timeline.mark("session_update_sent")
+        return ws
+
+    async def __aenter__(self):
+        self._ws = await self._open()
+        self._connected.set()
+        self._up_since = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ===== Browser -> OpenAI =====
+    async def send(self, message):
+        """Send, or hold the message while reconnecting; raises UpstreamClosed once reconnecting gave up"""
+        event_type = events.peek_type(message)
+        audio = event_type == "input_audio_buffer.append"
+        briefing = False
+        if not audio:
+            message, briefing = self._observe_outgoing(message)
+        # Only the caller's audio and briefings make sense on a new session; the rest is old conversation
+        replay = audio or briefing or event_type in ("input_audio_buffer.commit", "input_audio_buffer.clear")
+        if event_type == "response.create" and self._settle is not None and not self._settle.done():
+            # The settle task sends the one reply of a resumed session (e.g. for the tool flush)
+            self._reply_due = True
+            return
+        if self._connected.is_set():
+            try:
+                await self._ws.send(message)
+                return
+            except websockets.exceptions.ConnectionClosed:
+                self._connected.clear()  # the receive side notices too and reconnects
+        if self._failed is not None or self._closed:
+            raise UpstreamClosed(f"upstream connection lost: {self._failed}")
+        self._hold(message, audio, replay)
+
+    def _hold(self, message: str, audio: bool, replay: bool):
+        self._gap.append((next(self._gap_seq), message, audio, replay))
+        if audio:
+            self._gap_audio_bytes += len(message) * 3 // 4
+            _count("audio_buffered")
+            # Keep only the most recent UPSTREAM_BUFFER_MS of caller audio
+            while self._gap_audio_bytes > UPSTREAM_BUFFER_MS * BYTES_PER_MS:
+                for i, (_, old, is_audio, _) in enumerate(self._gap):
+                    if is_audio:
+                        del self._gap[i]
+                        self._gap_audio_bytes -= len(old) * 3 // 4
+                        _count("audio_dropped")
+                        break
+
+    def _observe_outgoing(self, message: str) -> tuple[str, bool]:
+        """Record tool results and reply requests. A result for a call from a previous
+        connection is rewritten as a system message; returns (message, rewritten)"""
+        try:
+            event_type, data = events.classify(message)
+        except ValueError:
+            return message, False
+        if event_type == "conversation.item.create" and data.get("item", {}).get("type") == "function_call_output":
+            item = data["item"]
+            call = self.log.calls.pop(item.get("call_id"), "tool")
+            self.log.add(f"Tool {call} -> {item.get('output', '')}")
+            if item.get("call_id") in self._stale_calls:
+                self._stale_calls.discard(item.get("call_id"))
+                return json.dumps({
+                    "type": "conversation.item.create",
+                    "item": {"type": "message", "role": "system",
+                             "content": [{"type": "input_text", "text": f"Result of {call}: {item.get('output', '')}"}]},
+                }), True
+        elif event_type == "response.create":
+            self._requested = True
+        return message, False
+
+    # ===== OpenAI -> browser =====
+    def observe(self, event_type: str, data: dict):
+        """Feed decoded upstream events; builds the summary replayed after a reconnect"""
+        if event_type == "conversation.item.input_audio_transcription.completed":
+            self.log.add(f"Caller: {data.get('transcript', '')}")
+        elif event_type == "response.audio_transcript.done":
+            self.log.add(f"Agent: {data.get('transcript', '')}")
+        elif event_type == "response.function_call_arguments.done":
+            self.log.calls[data.get("call_id")] = f"{data.get('name')}({data.get('arguments', '')})"
+        elif event_type == "response.created":
+            self._responding = True
+            self._requested = False
+            self._new_turn.set()
+        elif event_type == "input_audio_buffer.speech_started":
+            self._new_turn.set()
+        elif event_type == "response.done":
+            self._responding = False
+
+    async def __aiter__(self):
+        """Upstream messages, across reconnects; ends on a clean close and raises
+        UpstreamClosed once reconnecting gives up"""
+        while True:
+            try:
+                async for message in self._ws:
+                    yield message
+                self._closed = True
+                return
+            except websockets.exceptions.ConnectionClosedError as e:
+                if self._closed or UPSTREAM_RECONNECT_ATTEMPTS <= 0:
+                    raise
+                if not await self._reconnect(e):
+                    if self._closed:
+                        return  # the caller hung up while we were reconnecting
+                    raise UpstreamClosed("Lost the connection to OpenAI and could not resume the call") from e
+
+    def _backoff(self, attempt: int) -> float:
+        """Delay before an attempt; grows across consecutive drops, not just within one"""
+        n = self._drops + attempt
+        # The first attempt after a stable connection is immediate; most drops are transient
+        if n == 0:
+            return 0.0
+        return min(UPSTREAM_RECONNECT_BACKOFF * 2 ** (n - 1), MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+
+    async def _reconnect(self, reason: Exception) -> bool:
+        self._connected.clear()
+        self._new_turn.clear()
+        if self._settle is not None and not self._settle.done():
+            # Dropped again before the last resume settled: its reply is still owed
+            self._settle.cancel()
+            self._requested = self._requested or self._reply_due
+        self._reply_due = False
+        if time.monotonic() - self._up_since >= UPSTREAM_STABLE_SECONDS:
+            self._drops = 0
+        if self._reconnects >= UPSTREAM_RECONNECT_MAX:
+            _count("reconnect_failures")
+            self._failed = reason
+            logger.error("❌ OpenAI connection dropped again (%s) after %d reconnects, giving up", reason, self._reconnects)
+            return False
+        started = time.perf_counter()
+        self._reply_owed = self._responding or self._requested
+        self._responding = self._requested = False
+        self._stale_calls = set(self.log.calls)
+        logger.warning("⚠️ OpenAI connection dropped (%s), reconnecting", reason)
+        for attempt in range(UPSTREAM_RECONNECT_ATTEMPTS):
+            delay = self._backoff(attempt)
+            if delay:
+                await asyncio.sleep(delay)
+            if self._closed:
+                return False
+            ws = None
+            try:
+                ws = await self._open()
+                owed = await self._resume(ws)
+            except Exception as e:
+                logger.warning("⚠️ Reconnect attempt %d/%d failed: %s", attempt + 1, UPSTREAM_RECONNECT_ATTEMPTS, e)
+                if ws is not None:
+                    # Don't leak the half-resumed connection (and its session)
+                    await ws.close()
+                continue
+            if self._closed:
+                await ws.close()
+                return False
+            old, self._ws = self._ws, ws
+            self._connected.set()
+            self._up_since = time.monotonic()
+            self._reconnects += 1
+            self._drops += 1
+            asyncio.create_task(old.close())
+            gap = (time.perf_counter() - started) * 1000
+            _gap_ms.observe(gap)
+            _count("reconnects")
+            logger.info("🔁 Reconnected to OpenAI after %.0fms (attempt %d)", gap, attempt + 1)
+            self._reply_due = owed
+            self._settle = asyncio.create_task(self._settle_reply())
+            if self.on_resume is not None:
+                asyncio.create_task(self.on_resume())
+            return True
+        _count("reconnect_failures")
+        self._failed = reason
+        logger.error("❌ Could not reconnect to OpenAI after %d attempts", UPSTREAM_RECONNECT_ATTEMPTS)
+        return False
+
+    async def _resume(self, ws) -> bool:
+        """Brief the new session and replay the caller's audio from the gap; returns whether
+        a reply is owed (sent later by _settle_reply, unless the session starts one itself)"""
+        summary = self.log.summary()
+        if summary:
+            await ws.send(json.dumps({
+                "type": "conversation.item.create",
+                "item": {"type": "message", "role": "system", "content": [{"type": "input_text", "text": summary}]},
+            }))
+        # Sends arriving meanwhile are still held (_connected is not set), so replay until nothing
+        # new is held: the caller's _connected.set() follows the last check with no await in between.
+        # The gap is only cleared once the whole resume succeeded, so a failed attempt loses nothing
+        sent = -1
+        discarded = 0
+        while any(item[0] > sent for item in self._gap):
+            for seq, message, _, replay in [item for item in self._gap if item[0] > sent]:
+                if replay:
+                    await ws.send(message)
+                else:
+                    discarded += 1
+                sent = seq
+        self._gap.clear()
+        self._gap_audio_bytes = 0
+        _count("events_discarded", discarded)
+        # With tool calls still pending, their flush asks for the reply instead
+        owed = (self._reply_owed or self._requested) and not self._stale_calls
+        self._reply_owed = self._requested = False
+        return owed
+
+    async def _settle_reply(self):
+        """Send the one response.create a resumed session is owed, unless the session
+        started a turn by itself (server VAD answering the replayed audio)"""
+        try:
+            await asyncio.wait_for(self._new_turn.wait(), REPLY_GRACE_SECONDS)
+            started = True
+        except asyncio.TimeoutError:
+            started = False
+        due, self._reply_due = self._reply_due, False
+        if not due or started or self._closed:
+            return
+        self._requested = True  # still owed if the send below fails and triggers another reconnect
+        try:
+            await self._ws.send(json.dumps({"type": "response.create"}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def close(self):
+        self._closed = True
+        self._connected.clear()
+        if self._settle is not None:
+            self._settle.cancel()
+        if self._ws is not None:
+            await self._ws.close()
+
+def stats() -> dict:
+    with _lock:
+        s = dict(_stats)
+    s["gap_ms"] = _gap_ms.snapshot()
+    return s
+
+def exposition() -> str:
+    s = stats()
+    return "".join([
+        metrics.scalar("voice_agent_upstream_reconnects_total", "Upstream connections resumed after a drop",
+                       "counter", s["reconnects"]),
+        metrics.scalar("voice_agent_upstream_reconnect_failures_total", "Drops that could not be resumed",
+                       "counter", s["reconnect_failures"]),
+        metrics.scalar("voice_agent_upstream_audio_dropped_total", "Caller audio frames dropped while reconnecting",
+                       "counter", s["audio_dropped"]),
+        metrics.exposition("voice_agent_upstream_gap_ms", "Milliseconds from upstream drop to resumed session",
+                           [({}, _gap_ms)]),
+    ])
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Customer lookup benchmark: verification and policy lookups before and after
+the schema migrations (normalized customer columns + customer_policies index).
+
+Bulk-loads a synthetic book of business into a temporary database with the
+base schema, times the lookups, applies migrations.run(), and times them again.
+
+Usage:
+    python benchmarks/customer_lookup.py [--customers 1000000] [--policies 5000000]
+"""
+
+import os
+import sys
+import argparse
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def bulk_load(conn, customers, policies, rng):
+    now = "2024-01-01T00:00:00"
+    conn.executemany(
+        "INSERT INTO customers(full_name, email, last4, order_id) VALUES(?,?,?,?)",
+        ((f"Customer {i} Grey", f"customer{i}@example.com", f"{i % 10000:04d}", f"POLICY-{i}")
+         for i in range(customers)))
+    conn.executemany("""
+        INSERT INTO customer_policies(customer_email, policy_number, first_name, last_name,
+          premium, coverage_type, next_due_date, payment_method, status, created_at)
+        VALUES(?,?,?,?,?,?,?,?,?,?)""",
+        ((f"customer{rng.randrange(customers)}@example.com", f"PN-{i}", "Customer", "Grey",
+          1000.0, "Personal Auto", "2025-01-01", "Bank Draft", "active", now)
+         for i in range(policies)))
+    conn.commit()
+
+def time_lookups(label, fn, emails):
+    start = time.perf_counter()
+    for e in emails:
+        fn(e)
+    ms = (time.perf_counter() - start) * 1000 / len(emails)
+    print(f"  {label:<34}{ms:>10.3f} ms/lookup")
+    return ms
+
+def main():
+    parser = argparse.ArgumentParser(description="Time customer lookups before/after schema migrations")
+    parser.add_argument("--customers", type=int, default=1000000)
+    parser.add_argument("--policies", type=int, default=5000000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+
+    from backend import db, migrations
+
+    db.init_db(run_migrations=False)
+    rng = random.Random(7)
+    print(f"🌱 Loading {args.customers} customers / {args.policies} policies...")
+    start = time.perf_counter()
+    with db._conn() as conn:
+        bulk_load(conn, args.customers, args.policies, rng)
+    print(f"   loaded in {time.perf_counter() - start:.1f}s")
+
+    emails = [f"Customer{rng.randrange(args.customers)}@Example.com" for _ in range(args.lookups)]
+
+    def old_verify(email):
+        # Pre-migration verify_customer: exact email match, names normalized in Python
+        with db._conn() as conn:
+            row = conn.execute("SELECT * FROM customers WHERE email = ?", (email.lower(),)).fetchone()
+        name = "customer 1 gray"
+        return row and name in (row["full_name"].lower(), row["full_name"].lower().replace("grey", "gray"))
+
+    def new_verify(email):
+        with db._conn() as conn:
+            row = conn.execute("SELECT * FROM customers WHERE email_norm = ?",
+                               (migrations.normalize_email(email),)).fetchone()
+        return row and row["name_norm"] == migrations.normalize_name("Customer 1 Gray")
+
+    print("\nBefore migrations:")
+    before_verify = time_lookups("verify_customer lookup", old_verify, emails)
+    before_policies = time_lookups("get_customer_policies", db.get_customer_policies, emails[:20])
+
+    print("\nApplying migrations...")
+    start = time.perf_counter()
+    with db._conn() as conn:
+        migrations.run(conn)
+    print(f"   migrated in {time.perf_counter() - start:.1f}s")
+
+    print("\nAfter migrations:")
+    after_verify = time_lookups("verify_customer lookup", new_verify, emails)
+    after_policies = time_lookups("get_customer_policies", db.get_customer_policies, emails)
+
+    print(f"\nverify speedup: {before_verify / max(after_verify, 1e-9):.1f}x, "
+          f"get_customer_policies speedup: {before_policies / max(after_policies, 1e-9):.1f}x")
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
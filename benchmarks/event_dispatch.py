@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Realtime proxy event classification micro-benchmark.
+
+Replays a synthetic per-session event mix (mostly 100ms base64 PCM16 audio
+frames, plus transcript deltas and control events) through the old
+"json.loads every frame" path and events.classify(), reporting messages/sec
+and CPU microseconds per message and per session-second of audio.
+
+Usage:
+    python benchmarks/event_dispatch.py [--messages 20000]
+"""
+
+import os
+import sys
+import argparse
+import base64
+import json
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FRAME_MS = 100
+PCM16_BYTES_PER_MS = 48  # 24 kHz * 2 bytes
+
+def make_mix(n, rng):
+    audio = base64.b64encode(os.urandom(FRAME_MS * PCM16_BYTES_PER_MS)).decode()
+    messages = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.45:
+            messages.append(json.dumps({"type": "input_audio_buffer.append", "audio": audio}))
+        elif r < 0.90:
+            messages.append(json.dumps({"type": "response.audio.delta", "event_id": f"evt_{i}",
+                                        "response_id": "resp_1", "item_id": "item_1",
+                                        "output_index": 0, "content_index": 0, "delta": audio}))
+        elif r < 0.98:
+            messages.append(json.dumps({"type": "response.audio_transcript.delta", "event_id": f"evt_{i}",
+                                        "delta": "Sure, let me pull that up"}))
+        else:
+            messages.append(json.dumps({"type": "response.done", "event_id": f"evt_{i}",
+                                        "response": {"id": "resp_1", "status": "completed", "output": []}}))
+    return messages
+
+def old_path(message):
+    data = json.loads(message)
+    return data.get("type", "unknown"), data
+
+def run(fn, messages):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for m in messages:
+        fn(m)
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full JSON decode vs. prefix-scan event classification")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    from backend import events
+
+    messages = make_mix(args.messages, random.Random(1))
+    audio_frames = sum(1 for m in messages if events.peek_type(m) in ("input_audio_buffer.append", "response.audio.delta"))
+    session_seconds = audio_frames * FRAME_MS / 1000 / 2  # one session streams both directions
+
+    print(f"{'path':<16}{'msgs/sec':>14}{'cpu us/msg':>14}{'cpu ms/session-s':>20}")
+    for label, fn in (("json.loads", old_path), ("events.classify", events.classify)):
+        wall, cpu = run(fn, messages)
+        print(f"{label:<16}{len(messages) / wall:>14,.0f}{cpu * 1e6 / len(messages):>14.2f}"
+              f"{cpu * 1000 / session_seconds:>20.3f}")
+
+if __name__ == "__main__":
+    main()
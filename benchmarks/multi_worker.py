@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Multi-worker load test: verification consistency and throughput scaling
+across uvicorn worker processes.
+
+For each (store, workers) combination, starts `uvicorn --workers N` on a
+seeded temporary database (plus `backend.state_server` for the redis store)
+and drives it with concurrent clients. Every request opens a new connection,
+so the kernel spreads a caller's requests over all workers. Each simulated
+caller verifies via POST /api/verify, then reads
+/api/customer/{email}/policies a few times with the same X-Session-Id:
+
+- consistency: reads refused with 403 after a successful verify (a worker that
+  never saw the verification)
+- rate limit: allowed attempts out of 3x VERIFY_RATE_LIMIT failed verifies
+  for one email (should equal the limit regardless of worker count)
+- audits: rows written vs. events generated, after a graceful shutdown. With
+  the redis store, audits must go through the shared queue: the run fails if
+  no worker queued an event or any worker fell back to direct writes
+
+Usage:
+    python benchmarks/multi_worker.py [--workers 1,2,4] [--stores memory,redis] [--seconds 5]
+"""
+
+import os
+import sys
+import argparse
+import asyncio
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+RATE_LIMIT = 5
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def seed(db_path: str, customers: int):
+    os.environ["DB_PATH"] = db_path
+    from backend import db
+    db.init_db()
+    db.seed_many([], [{"full_name": f"Customer {i}", "email": f"customer{i}@example.com",
+                       "last4": f"{i % 10000:04d}"} for i in range(customers)])
+    db.close_pool()
+
+def wait_for(port: int, path: str = "/api/db/stats", timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}{path}", timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port}")
+
+async def drive(port: int, seconds: float, clients: int, reads: int, customers: int,
+                proc: int = 0, procs: int = 1) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    # No keep-alive: every request is a new connection, so workers are picked per request
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=0)
+    totals = {"requests": 0, "errors": 0, "verified": 0, "reads_ok": 0, "reads_refused": 0, "audit_events": 0}
+    counter = iter(range(proc, 10 ** 9, procs))
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=10.0) as client:
+        async def caller():
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                n = next(counter)
+                i = n % customers
+                email = f"customer{i}@example.com"
+                headers = {"X-Session-Id": f"bench-{n}"}
+                try:
+                    r = await client.post("/api/verify", headers=headers,
+                                          json={"email": email, "full_name": f"Customer {i}", "last4": f"{i % 10000:04d}"})
+                    totals["requests"] += 1
+                    totals["audit_events"] += 1
+                    if r.status_code != 200:
+                        totals["errors"] += 1
+                        continue
+                    totals["verified"] += 1
+                    for _ in range(reads):
+                        r = await client.get(f"/api/customer/{email}/policies", headers=headers)
+                        totals["requests"] += 1
+                        if r.status_code == 200:
+                            totals["reads_ok"] += 1
+                            totals["audit_events"] += 1
+                        elif r.status_code == 403:
+                            totals["reads_refused"] += 1
+                        else:
+                            totals["errors"] += 1
+                except httpx.HTTPError:
+                    totals["errors"] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(clients)))
+        totals["elapsed"] = time.perf_counter() - start
+    return totals
+
+def drive_process(port: int, seconds: float, clients: int, reads: int, customers: int, proc: int, procs: int) -> dict:
+    return asyncio.run(drive(port, seconds, clients, reads, customers, proc, procs))
+
+def check_rate_limit(port: int) -> int:
+    """Failed verify attempts against one email from fresh sessions; returns how many were not 429"""
+    allowed = 0
+    for n in range(RATE_LIMIT * 3):
+        r = httpx.post(f"http://127.0.0.1:{port}/api/verify", headers={"X-Session-Id": f"rl-{n}"},
+                       json={"email": "rate.limit@example.com", "full_name": "Wrong Name"})
+        allowed += r.status_code != 429
+    return allowed
+
+def run_case(store: str, workers: int, args, template_db: str) -> dict:
+    db_path = os.path.join(os.path.dirname(template_db), f"{store}-{workers}.db")
+    shutil.copy(template_db, db_path)
+    port = free_port()
+    env = dict(os.environ, DB_PATH=db_path, SESSION_STORE=store, SESSION_POOL_SIZE="0",
+               LOG_LEVEL="WARNING", VERIFY_RATE_LIMIT=str(RATE_LIMIT), VERIFY_RATE_WINDOW="300",
+               PYTHONPATH=os.pathsep.join(p for p in (ROOT, os.environ.get("PYTHONPATH")) if p))
+    procs = []
+    if store == "redis":
+        store_port = free_port()
+        env["SESSION_STORE_URL"] = f"redis://127.0.0.1:{store_port}/0"
+        env["AUDIT_QUEUE_BACKEND"] = "store"
+        procs.append(subprocess.Popen([sys.executable, "-m", "backend.state_server", "--port", str(store_port)],
+                                      cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        wait_for_port(store_port)
+    server_log = open(os.path.join(os.path.dirname(template_db), f"{store}-{workers}.log"), "w+")
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+                               "--workers", str(workers), "--log-level", "warning"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=server_log)
+    try:
+        wait_for(port)
+        # Several load processes, so the client side is not the bottleneck
+        with ProcessPoolExecutor(args.procs) as pool:
+            results = list(pool.map(drive_process, *zip(*[
+                (port, args.seconds, args.clients, args.reads, args.customers, i, args.procs)
+                for i in range(args.procs)])))
+        totals = {k: sum(r[k] for r in results) for k in results[0] if k != "elapsed"}
+        totals["elapsed"] = max(r["elapsed"] for r in results)
+        totals["rate_limit_allowed"] = check_rate_limit(port)
+        totals["audit_events"] += RATE_LIMIT * 3
+        if store == "redis":
+            audit_stats = sample_audit_stats(port, workers)
+    finally:
+        # Graceful shutdown so every worker flushes its audit queue
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        for p in procs:
+            p.terminate()
+            p.wait()
+    with sqlite3.connect(db_path) as conn:
+        totals["audits_written"] = conn.execute("SELECT COUNT(*) FROM audits").fetchone()[0]
+    server_log.seek(0)
+    log = server_log.read()
+    server_log.close()
+    if store == "redis":
+        if not audit_stats["queued"] or audit_stats["direct"] or "Shared audit queue unavailable" in log:
+            raise RuntimeError(f"audits bypassed the shared queue ({audit_stats}); see {server_log.name}")
+    return totals
+
+def sample_audit_stats(port: int, workers: int) -> dict:
+    """Largest audit writer counters seen over a few /api/audits/stats requests
+    (each one a new connection, so every worker is likely to answer at least once)"""
+    worst = {"queued": 0, "direct": 0}
+    for _ in range(workers * 10):
+        s = httpx.get(f"http://127.0.0.1:{port}/api/audits/stats", timeout=5.0).json()
+        if s.get("backend") != "store":
+            raise RuntimeError(f"expected the store audit queue, got {s}")
+        worst = {k: max(worst[k], s[k]) for k in worst}
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser(description="Consistency and throughput across uvicorn workers")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--stores", default="memory,redis", help="comma-separated SESSION_STORE backends")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent callers per load process")
+    parser.add_argument("--procs", type=int, default=2, help="load generator processes")
+    parser.add_argument("--reads", type=int, default=3, help="policy reads per verified caller")
+    parser.add_argument("--customers", type=int, default=5000)
+    args = parser.parse_args()
+
+    template_db = os.path.join(tempfile.mkdtemp(), "template.db")
+    seed(template_db, args.customers)
+    print(f"{'store':<8}{'workers':>8}{'req/s':>10}{'refused':>10}{'rate limit':>12}{'audits':>16}")
+    for store in args.stores.split(","):
+        for workers in (int(w) for w in args.workers.split(",")):
+            t = run_case(store, workers, args, template_db)
+            reads = t["reads_ok"] + t["reads_refused"]
+            refused = t["reads_refused"] / reads if reads else 0.0
+            print(f"{store:<8}{workers:>8}{t['requests'] / t['elapsed']:>10.0f}{refused:>9.1%}"
+                  f"{t['rate_limit_allowed']:>7}/{RATE_LIMIT:<4}"
+                  f"{t['audits_written']:>8}/{t['audit_events']:<7}"
+                  f"{'  (' + str(t['errors']) + ' errors)' if t['errors'] else ''}")
+    print("\nrefused: policy reads rejected after a successful verify (should be 0%)")
+    print(f"rate limit: verify attempts allowed for one email (should be {RATE_LIMIT})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Policy search benchmark: FTS5 index vs. the old triple LIKE '%q%' scan.
+
+Builds a synthetic policy corpus in a temporary database, then times a fixed
+set of queries through db.search_policies (FTS5, top --limit by rank) and the
+old unbounded LIKE scan (search.like_search).
+
+Usage:
+    python benchmarks/policy_search.py [--docs 100000] [--repeat 20]
+"""
+
+import os
+import sys
+import argparse
+import itertools
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECTIONS = ["Auto Insurance", "Property Insurance", "Claims", "Underwriting",
+            "Policy Administration", "Commercial Lines", "Umbrella", "Marine"]
+WORDS = ("coverage liability deductible premium collision comprehensive dwelling "
+         "structure flood earthquake theft vandalism fire adjuster settlement "
+         "cancellation reinstatement refund notice endorsement exclusion rider "
+         "limit aggregate occurrence bodily injury property damage uninsured "
+         "motorist vehicle driver credit score location construction roof "
+         "mortgage lienholder appraisal subrogation salvage rental towing").split()
+QUERIES = ["flood", "collision deductible", "subro", "bodily injury", "reinstate",
+           "umbrella", "zzzz-no-match", "roof"]
+
+def build_vocabulary(rng, size=20000):
+    """Domain words mixed into a Zipf-distributed filler vocabulary, so term
+    frequencies look like real prose rather than every word in every doc."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    filler = {"".join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(size)}
+    vocab = list(filler)
+    rng.shuffle(vocab)
+    for i, w in enumerate(WORDS):
+        vocab.insert(50 + i * 97, w)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocab))))
+    return vocab, cum_weights
+
+def make_policy(i, rng, vocab, cum_weights):
+    words = rng.choices(vocab, cum_weights=cum_weights, k=60)
+    return {
+        "topic": f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}",
+        "section": rng.choice(SECTIONS),
+        "classification": rng.choice(["public", "internal", "restricted"]),
+        "text": " ".join(words).capitalize() + ".",
+    }
+
+def time_queries(fn, repeat):
+    results = {}
+    for q in QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            n = len(fn(q))
+        results[q] = ((time.perf_counter() - start) * 1000 / repeat, n)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FTS5 and LIKE policy search")
+    parser.add_argument("--docs", type=int, default=100000, help="Number of synthetic policy documents")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query")
+    parser.add_argument("--limit", type=int, default=50, help="FTS5 result limit")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+
+    from backend import db, search
+    db.init_db()
+
+    print(f"🌱 Seeding {args.docs} policies...")
+    rng = random.Random(42)
+    vocab, cum_weights = build_vocabulary(rng)
+    batch = []
+    for i in range(args.docs):
+        batch.append(make_policy(i, rng, vocab, cum_weights))
+        if len(batch) == 5000:
+            db.seed_many(batch, [])
+            batch = []
+    if batch:
+        db.seed_many(batch, [])
+
+    # The pre-FTS query: unbounded substring scan over all three columns
+    def like(q):
+        with db._conn() as conn:
+            return search.like_search(conn, q)
+
+    fts = time_queries(lambda q: db.search_policies(q, args.limit, snippets=True), args.repeat)
+    scan = time_queries(like, args.repeat)
+
+    print(f"\n{'query':<24}{'LIKE ms':>10}{'FTS5 ms':>10}{'speedup':>10}")
+    for q in QUERIES:
+        like_ms, fts_ms = scan[q][0], fts[q][0]
+        print(f"{q:<24}{like_ms:>10.2f}{fts_ms:>10.2f}{like_ms / max(fts_ms, 1e-6):>9.1f}x")
+
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Concurrent-caller load test for the /ws/realtime proxy.
+
+For each session count, starts `backend.mock_realtime` (the upstream
+stand-in) and one uvicorn worker pointed at it, then connects N synthetic
+browser clients. Each client streams 20ms PCM16 appends at 24kHz real-time
+pacing. Every `--speech-ms` of audio the mock treats as a user turn and plays
+the next turn of its script, which includes verify_customer,
+get_customer_policies and get_pc_coverage_info calls that the proxy executes.
+
+Measured over the steady-state window (after the ramp):
+
+- relay_downstream_ms: mock send -> client receive, for every relayed event
+- relay_upstream_ms: client append -> mock commit, for the append ending a turn
+- turn_rtt_ms: client append -> speech_started back at the client
+- tool_roundtrip_ms: function calls announced -> proxy's response.create (from the mock)
+- probe_ms: HTTP round trip to a cheap proxy endpoint (how responsive the worker stays)
+- proxy_loop_lag_ms, relay: the proxy's own event-loop lag samples and relay queue counters
+- client_loop_lag_ms: load generator's own lag; if high, add --procs
+- cpu/rss: the proxy process (from /proc, Linux only), total and per session
+
+Results are printed and written as JSON to --out so runs can be compared across releases.
+
+Usage:
+    python benchmarks/realtime_load.py [--sessions 10,50,100] [--seconds 20] [--out realtime_load.json]
+"""
+
+import os
+import sys
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+import websockets
+
+from backend import events
+
+FRAME_MS = 20
+FRAME_BYTES = 24000 * 2 * FRAME_MS // 1000
+PROBE_PATH = "/api/logs/stats"
+_SENT_AT_RE = re.compile(r'"sent_at":([0-9.]+)')
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+def summarize(samples: list, per_session: list | None = None) -> dict:
+    s = {
+        "count": len(samples),
+        "p50": round(percentile(samples, 50), 2),
+        "p95": round(percentile(samples, 95), 2),
+        "p99": round(percentile(samples, 99), 2),
+        "max": round(max(samples), 2) if samples else 0.0,
+    }
+    if per_session is not None:
+        s["worst_session_p95"] = round(max((percentile(x, 95) for x in per_session if x), default=0.0), 2)
+    return s
+
+def seed(db_path: str):
+    os.environ["DB_PATH"] = db_path
+    from backend import db
+    db.init_db()
+    db.seed_customer_policies()
+    db.seed_pc_policies()
+    db.seed_many([], [{"full_name": "Heather Gray", "email": "maria92@example.com", "last4": "1234"}])
+    db.close_pool()
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+class ProcSampler:
+    """CPU seconds and RSS of one process, read from /proc (None elsewhere)"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.tick = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self) -> float | None:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self.tick  # utime + stime
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_mb(self) -> float | None:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+async def caller(port: int, start_at: float, measure_from: float, stop_at: float, frames_per_turn: int,
+                 binary: bool, out: dict):
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    pcm = bytes(FRAME_BYTES)
+    frame = pcm if binary else events.audio_append(pcm)
+    sent_times = []  # send time of the append that ends each turn
+    downstream, upstream, turn_rtt = [], [], []
+    counts = {"frames_sent": 0, "events": 0, "audio_deltas": 0, "errors": 0}
+
+    try:
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/realtime" + ("?binary_audio=1" if binary else ""),
+                                      max_size=None) as ws:
+            out["connected"] += 1
+
+            async def send_audio():
+                # Paced against the start so send overhead doesn't accumulate as drift
+                t0 = time.perf_counter()
+                while time.time() < stop_at:
+                    await ws.send(frame)
+                    counts["frames_sent"] += 1
+                    if counts["frames_sent"] % frames_per_turn == 0:
+                        sent_times.append(time.time())
+                    due = t0 + counts["frames_sent"] * FRAME_MS / 1000
+                    await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+            async def receive():
+                turns = 0
+                async for message in ws:
+                    now = time.time()
+                    counts["events"] += 1
+                    if isinstance(message, bytes):
+                        counts["audio_deltas"] += 1
+                        continue
+                    event_type = events.peek_type(message)
+                    if event_type == "response.audio.delta":
+                        counts["audio_deltas"] += 1
+                    elif event_type == "error":
+                        counts["errors"] += 1
+                    m = _SENT_AT_RE.search(message, 0, 200)
+                    if m is None or now < measure_from:
+                        if event_type == "input_audio_buffer.speech_started":
+                            turns += 1
+                        continue
+                    sent_at = float(m.group(1))
+                    downstream.append((now - sent_at) * 1000)
+                    if event_type == "input_audio_buffer.speech_started":
+                        if turns < len(sent_times):
+                            upstream.append((sent_at - sent_times[turns]) * 1000)
+                            turn_rtt.append((now - sent_times[turns]) * 1000)
+                        turns += 1
+
+            receiver = asyncio.create_task(receive())
+            await send_audio()
+            receiver.cancel()
+    except (OSError, websockets.exceptions.WebSocketException):
+        out["failed"] += 1
+    out["downstream"].append(downstream)
+    out["upstream"].extend(upstream)
+    out["turn_rtt"].extend(turn_rtt)
+    for k, v in counts.items():
+        out[k] += v
+
+async def loop_lag(stop_at: float, samples: list):
+    while time.time() < stop_at:
+        t = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append((time.perf_counter() - t - 0.01) * 1000)
+
+async def drive(port: int, sessions: int, ramp: float, seconds: float, frames_per_turn: int, binary: bool,
+                start: float) -> dict:
+    out = {"connected": 0, "failed": 0, "frames_sent": 0, "events": 0, "audio_deltas": 0, "errors": 0,
+           "downstream": [], "upstream": [], "turn_rtt": [], "loop_lag": []}
+    measure_from, stop_at = start + ramp, start + ramp + seconds
+    lag = asyncio.create_task(loop_lag(stop_at, out["loop_lag"]))
+    await asyncio.gather(*(caller(port, start + random.uniform(0, ramp), measure_from, stop_at,
+                                  frames_per_turn, binary, out) for _ in range(sessions)))
+    await lag
+    return out
+
+def drive_process(*args) -> dict:
+    return asyncio.run(drive(*args))
+
+def probe(port: int, stop: threading.Event, samples: list):
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=10.0) as client:
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                client.get(PROBE_PATH)
+                samples.append((time.perf_counter() - t) * 1000)
+            except httpx.HTTPError:
+                pass
+            stop.wait(0.1)
+
+def run_case(sessions: int, args, template_db: str) -> dict:
+    db_path = os.path.join(os.path.dirname(template_db), f"sessions-{sessions}.db")
+    shutil.copy(template_db, db_path)
+    mock_port, port = free_port(), free_port()
+    env = dict(os.environ, DB_PATH=db_path, SESSION_POOL_SIZE="0", LOG_LEVEL="WARNING",
+               VERIFY_RATE_LIMIT="0",  # every caller verifies the same demo customer
+               REALTIME_SESSIONS_URL=f"http://127.0.0.1:{mock_port}/v1/realtime/sessions",
+               REALTIME_WS_URL=f"ws://127.0.0.1:{mock_port}/v1/realtime",
+               PYTHONPATH=os.pathsep.join(p for p in (ROOT, os.environ.get("PYTHONPATH")) if p))
+    mock = subprocess.Popen([sys.executable, "-m", "backend.mock_realtime", "--port", str(mock_port),
+                             "--speech-ms", str(args.speech_ms), "--timestamps"],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+                               "--log-level", "warning"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f"http://127.0.0.1:{mock_port}/stats")
+        wait_for(f"http://127.0.0.1:{port}{PROBE_PATH}")
+        sampler = ProcSampler(server.pid)
+        rss_idle = sampler.rss_mb()
+
+        # The mock commits a turn once it has counted speech_ms of appends (by message size, as the proxy frames them)
+        frames_per_turn = -(-args.speech_ms * 48 // (len(events.audio_append(bytes(FRAME_BYTES))) * 3 // 4))
+        start = time.time() + 0.5
+        probes, stop = [], threading.Event()
+        prober = threading.Thread(target=probe, args=(port, stop, probes), daemon=True)
+        with ProcessPoolExecutor(args.procs) as pool:
+            shares = [sessions // args.procs + (i < sessions % args.procs) for i in range(args.procs)]
+            futures = [pool.submit(drive_process, port, n, args.ramp, args.seconds, frames_per_turn, args.binary, start)
+                       for n in shares if n]
+            time.sleep(max(0.0, start + args.ramp - time.time()))
+            probe_from = len(probes)
+            prober.start()
+            cpu0, t0 = sampler.cpu_seconds(), time.perf_counter()
+            time.sleep(args.seconds)
+            cpu1, elapsed = sampler.cpu_seconds(), time.perf_counter() - t0
+            rss_load = sampler.rss_mb()
+            stop.set()
+            results = [f.result() for f in futures]
+        prober.join()
+        mock_stats = httpx.get(f"http://127.0.0.1:{mock_port}/stats").json()
+        tool_stats = httpx.get(f"http://127.0.0.1:{port}/api/tools/stats").json()
+        relay_stats = httpx.get(f"http://127.0.0.1:{port}/api/relay/stats").json()
+    finally:
+        for p in (server, mock):
+            p.send_signal(signal.SIGINT)
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    merged = {k: sum(r[k] for r in results) for k in ("connected", "failed", "frames_sent", "events",
+                                                       "audio_deltas", "errors")}
+    downstream = [s for r in results for s in r["downstream"]]
+    cpu = (cpu1 - cpu0) / elapsed * 100 if cpu0 is not None and cpu1 is not None else None
+    roundtrip = mock_stats["tool_roundtrip_ms"]
+    return {
+        "sessions": sessions,
+        **merged,
+        "relay_downstream_ms": summarize([x for s in downstream for x in s], downstream),
+        "relay_upstream_ms": summarize([x for r in results for x in r["upstream"]]),
+        "turn_rtt_ms": summarize([x for r in results for x in r["turn_rtt"]]),
+        "tool_roundtrip_ms": {k: roundtrip[k] for k in ("count", "avg", "p50", "p95", "p99", "max")},
+        "tool_latency_ms": {name: {k: t["latency_ms"][k] for k in ("count", "p50", "p95", "p99")}
+                            for name, t in tool_stats["tools"].items()},
+        "tool_calls": {"executed": tool_stats["calls"], "duplicates_suppressed": tool_stats["duplicates_suppressed"]},
+        "probe_ms": summarize(probes[probe_from:]),
+        "client_loop_lag_ms": summarize([x for r in results for x in r["loop_lag"]]),
+        "proxy_loop_lag_ms": {k: relay_stats["event_loop_lag_ms"][k] for k in ("count", "p50", "p95", "p99", "max")},
+        "relay": {d: {k: relay_stats[d][k] for k in ("sent", "dropped", "coalesced", "blocked")}
+                  for d in ("upstream", "downstream")},
+        "cpu_percent": round(cpu, 1) if cpu is not None else None,
+        "cpu_percent_per_session": round(cpu / sessions, 3) if cpu is not None else None,
+        "rss_mb_idle": round(rss_idle, 1) if rss_idle is not None else None,
+        "rss_mb": round(rss_load, 1) if rss_load is not None else None,
+        "rss_kb_per_session": round((rss_load - rss_idle) * 1024 / sessions, 1)
+                              if rss_idle is not None and rss_load is not None else None,
+    }
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent callers through /ws/realtime against a local upstream")
+    parser.add_argument("--sessions", default="10,50,100", help="comma-separated concurrent session counts")
+    parser.add_argument("--seconds", type=float, default=20.0, help="measured steady-state window")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which sessions connect")
+    parser.add_argument("--speech-ms", type=int, default=4000, help="appended audio per user turn")
+    parser.add_argument("--procs", type=int, default=1, help="load generator processes")
+    parser.add_argument("--binary", action="store_true", help="binary PCM16 frames (?binary_audio=1) instead of JSON")
+    parser.add_argument("--out", default="realtime_load.json", help="JSON report path")
+    args = parser.parse_args()
+
+    template_db = os.path.join(tempfile.mkdtemp(), "template.db")
+    seed(template_db)
+    report = {
+        "benchmark": "realtime_load",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": git_commit(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": vars(args),
+        "cases": [],
+    }
+    print(f"{'sessions':>8}{'down p50':>10}{'down p99':>10}{'turn p95':>10}{'tool p95':>10}"
+          f"{'probe p95':>11}{'lag p99':>9}{'cpu %':>8}{'KB/sess':>9}")
+    for sessions in (int(n) for n in args.sessions.split(",")):
+        case = run_case(sessions, args, template_db)
+        report["cases"].append(case)
+        print(f"{sessions:>8}{case['relay_downstream_ms']['p50']:>10.1f}{case['relay_downstream_ms']['p99']:>10.1f}"
+              f"{case['turn_rtt_ms']['p95']:>10.1f}{case['tool_roundtrip_ms']['p95']:>10.1f}"
+              f"{case['probe_ms']['p95']:>11.1f}{case['proxy_loop_lag_ms']['p99']:>9.1f}{case['cpu_percent'] or 0:>8.1f}{case['rss_kb_per_session'] or 0:>9.0f}"
+              f"{'  (' + str(case['failed']) + ' failed)' if case['failed'] else ''}")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.out}")
+    print("down: mock -> client relay latency, turn: client append -> speech_started round trip (ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Audio forwarding jitter benchmark for tool calls on the event loop.
+
+Simulates N concurrent proxy sessions. Each session forwards a 20ms audio
+frame on a fixed cadence while a second task performs the tool-call lookups
+the Realtime proxy does (verify_customer, get_customer_policies, get_policy)
+plus an audit write. Lookups run either directly on the loop ("sync", the old
+behaviour) or through backend.async_db ("async"). Jitter is how late each
+audio frame is forwarded relative to its schedule.
+
+Usage:
+    python benchmarks/tool_call_jitter.py [--sessions 20] [--seconds 5]
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FRAME_MS = 20
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+async def forward_audio(stop_at, lateness):
+    next_tick = time.perf_counter()
+    while time.perf_counter() < stop_at:
+        next_tick += FRAME_MS / 1000
+        await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+        lateness.append((time.perf_counter() - next_tick) * 1000)
+
+async def tool_calls(mode, stop_at, db, async_db):
+    email = "maria92@example.com"
+    while time.perf_counter() < stop_at:
+        if mode == "sync":
+            db.verify_customer(email, "Heather Gray", "1234")
+            db.get_customer_policies(email)
+            db.get_policy("auto_coverage_limits")
+            db.log("agent", "bench_tool_call", email)
+            await asyncio.sleep(0)
+        else:
+            await async_db.verify_customer(email, "Heather Gray", "1234")
+            await async_db.get_customer_policies(email)
+            await async_db.get_policy("auto_coverage_limits")
+            await async_db.log("agent", "bench_tool_call", email)
+
+async def run_mode(mode, sessions, seconds, db, async_db):
+    lateness = []
+    stop_at = time.perf_counter() + seconds
+    tasks = []
+    for _ in range(sessions):
+        tasks.append(forward_audio(stop_at, lateness))
+        tasks.append(tool_calls(mode, stop_at, db, async_db))
+    await asyncio.gather(*tasks)
+    return lateness
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure audio forwarding jitter under concurrent tool calls")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated sessions")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per mode")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    os.environ["DB_PATH"] = os.path.join(tmpdir, "bench.db")
+
+    from backend import db, async_db
+    db.init_db()
+    db.seed_pc_policies()
+    db.seed_customer_policies()
+    db.seed_many([], [{"full_name": "Heather Gray", "email": "maria92@example.com", "last4": "1234"}])
+
+    print(f"{'mode':<8}{'frames':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode in ("sync", "async"):
+        lateness = asyncio.run(run_mode(mode, args.sessions, args.seconds, db, async_db))
+        print(f"{mode:<8}{len(lateness):>8}"
+              f"{percentile(lateness, 50):>10.2f}{percentile(lateness, 95):>10.2f}"
+              f"{percentile(lateness, 99):>10.2f}{max(lateness or [0]):>10.2f}")
+
+    async_db.shutdown()
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
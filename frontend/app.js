@@ -222,18 +222,10 @@ function sendRawAudioToOpenAI(float32Data) {
       pcm16[i] = Math.floor(sample * 32767);
     }
     
-    // Convert to base64
-    const bytes = new Uint8Array(pcm16.buffer);
-    const base64Audio = btoa(String.fromCharCode.apply(null, bytes));
-    
-    // Send audio input event to OpenAI - let server-side VAD handle timing
+    // Send raw PCM16 as a binary frame - the backend proxy wraps it in an
+    // input_audio_buffer.append event, so no base64/JSON work happens here
     if (websocket && websocket.readyState === WebSocket.OPEN) {
-      sendMessage({
-        type: "input_audio_buffer.append",
-        audio: base64Audio
-      });
-      
-      console.log("🎤 Raw audio chunk sent to OpenAI, samples:", float32Data.length, "base64 length:", base64Audio.length);
+      websocket.send(pcm16.buffer);
     }
   } catch (error) {
     console.error("❌ Error sending raw audio:", error);
@@ -274,20 +266,21 @@ function playAudioDelta(audioData) {
       bytes[i] = binaryString.charCodeAt(i);
     }
     
-    // Convert to Int16Array (PCM16)
-    const pcm16 = new Int16Array(bytes.buffer);
-    
-    // Queue the audio for playback
-    audioQueue.push(pcm16);
-    
-    if (!isPlaying) {
-      playNextAudio();
-    }
+    queuePcm16(new Int16Array(bytes.buffer));
   } catch (error) {
     console.error("Error playing audio delta:", error);
   }
 }
 
+// Queue raw PCM16 (from a binary frame or a decoded delta) for playback
+function queuePcm16(pcm16) {
+  audioQueue.push(pcm16);
+  
+  if (!isPlaying) {
+    playNextAudio();
+  }
+}
+
 async function playNextAudio() {
   if (audioQueue.length === 0) {
     isPlaying = false;
@@ -403,10 +396,12 @@ async function startCall() {
   try {
     // Connect to our backend WebSocket proxy instead of directly to OpenAI
     console.log("Connecting to backend WebSocket proxy...");
-    const wsUrl = `ws://localhost:8001/ws/realtime`;
+    // binary_audio=1: the proxy sends assistant audio as raw PCM16 binary frames
+    const wsUrl = `ws://localhost:8001/ws/realtime?binary_audio=1`;
     console.log("WebSocket URL:", wsUrl);
     
     websocket = new WebSocket(wsUrl);
+    websocket.binaryType = "arraybuffer";
     
     // Add connection timeout
     const connectionTimeout = setTimeout(() => {
@@ -450,6 +445,11 @@ async function startCall() {
     };
 
     websocket.onmessage = (event) => {
+      // Binary frames are assistant audio (raw PCM16, 24kHz mono)
+      if (event.data instanceof ArrayBuffer) {
+        queuePcm16(new Int16Array(event.data));
+        return;
+      }
       try {
         const data = JSON.parse(event.data);
         console.log("📨 Received WebSocket message:", data);
@@ -23,7 +23,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
 try:
-    from backend import db
+    from backend import db, migrations
     from backend.config import DB_PATH
 except ImportError:
     print("❌ Error: Could not import backend modules. Make sure you're running from the project root.")
@@ -109,14 +109,17 @@ def seed_sample_customers():
     for customer in sample_customers:
         try:
             c.execute("""
-            INSERT INTO customers(full_name, email, last4, order_id)
-            VALUES(?,?,?,?)
+            INSERT INTO customers(full_name, email, last4, order_id, email_norm, name_norm)
+            VALUES(?,?,?,?,?,?)
             ON CONFLICT(email) DO UPDATE SET
               full_name=excluded.full_name,
               last4=excluded.last4,
-              order_id=excluded.order_id
+              order_id=excluded.order_id,
+              email_norm=excluded.email_norm,
+              name_norm=excluded.name_norm
             """, (customer["full_name"], customer["email"].lower(), 
-                  customer["last4"], customer["order_id"]))
+                  customer["last4"], customer["order_id"],
+                  migrations.normalize_email(customer["email"]), migrations.normalize_name(customer["full_name"])))
             added += 1
         except Exception as e:
             print(f"⚠️  Warning: Could not add customer {customer['email']}: {e}")
@@ -135,8 +138,10 @@ def initialize_database(force=False):
         
     # Initialize database schema
     print("📋 Creating database schema...")
-    db.init_db()
+    applied = db.init_db()
     print("✅ Database schema created/verified")
+    if applied:
+        print(f"✅ Applied {len(applied)} schema migration(s): {', '.join(applied)}")
     
     # Check existing data
     existing_data = check_existing_data()